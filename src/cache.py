@@ -1,10 +1,29 @@
 from pathlib import Path
 from dataclasses import asdict
+import threading
 import json
+import time
 
-from .utils import write_json, read_json, Version, File, Dependency
+from .utils import write_json, read_json, ensure_directory, Project, Version, VersionList, File, Dependency
 from .parser import refine_version_list
 
+# índice de slugs e ids, compartilhado por todos os caches de projeto
+PROJECT_INDEX = 'index.json'
+
+# por quanto tempo os dados gerais de um projeto são considerados atualizados
+PROJECT_TTL = 6 * 60 * 60
+
+# resultados negativos (slug inexistente, nenhuma versão compatível)
+# ficam pouco tempo, já que um projeto pode ganhar uma versão nova a qualquer momento
+NEGATIVE_CACHE = 'negative.json'
+NEGATIVE_TTL = 60 * 60
+
+_indexes: dict[Path, dict[str, str]] = {}
+_index_lock = threading.Lock()
+
+_negatives: dict[Path, dict[str, dict]] = {}
+_negative_lock = threading.Lock()
+
 def write_cache(slug: str, filename: str, dependencies: list, cache_file: Path):
     """
     escreve em um cache, quais slugs estão associados a quais filenames
@@ -26,35 +45,292 @@ def write_cache(slug: str, filename: str, dependencies: list, cache_file: Path):
     
     write_json(cache_file, data)
 
-def get_cached_version_list(project_id: str, cache_dir: Path) -> list[Version]:
-    version_list = []
-
-    # procurar um arquivo a partir do diretório de cache
-    # que corresponda ao id passado pra essa função
-    # se achar, reformata e retorna essa lista
-    valid_data = None
-    for f in cache_dir.rglob('*.json'):
-        if not f.is_file():
-            continue
-        
-        data = read_json(f)
-        if not isinstance(data, list):
-            continue
-    
-        if data[0].get('project_id') == project_id:
-            valid_data = data
+def _version_list_key(game_version: str | None, loaders: list[str] | None) -> str:
+    """
+    parte do nome do arquivo que identifica os filtros usados na requisição
+    assim listas filtradas pra versões ou loaders diferentes não se sobrescrevem
+    """
+
+    key = ''
+    if game_version:
+        key += f'@{game_version}'
+    if loaders:
+        key += '+' + ','.join(loaders)
+
+    return key
+
+def _get_project_index(cache_root: Path) -> dict[str, str]:
+    """
+    índice que associa slugs e ids ao id usado no nome dos arquivos de cache
+    ex: { 'sodium': 'AANobbMI', 'AANobbMI': 'AANobbMI' }
+
+    ele é lido do disco uma vez e depois mantido em memória
+    """
+
+    with _index_lock:
+        index = _indexes.get(cache_root)
+        if index is None:
+            index = read_json(cache_root / PROJECT_INDEX)
+            _indexes[cache_root] = index
+
+        return index
+
+def _update_project_index(cache_root: Path, project_id: str, slug: str):
+    index = _get_project_index(cache_root)
+
+    with _index_lock:
+        if index.get(slug) == project_id and index.get(project_id) == project_id:
+            return
+
+        index[slug] = project_id
+        index[project_id] = project_id
+
+        ensure_directory(cache_root)
+        write_json(cache_root / PROJECT_INDEX, dict(index))
+
+def get_cached_project_data(slug: str, cache_root: Path) -> tuple[dict, bool] | None:
+    """
+    obtém os dados gerais de um projeto do cache em disco
 
-    if valid_data:
-        for v in valid_data:
-            version_list = refine_version_list(data=valid_data, project_id=project_id)
+    returns:
+        tupla com os dados, no mesmo formato que a api retorna,
+        e se eles ainda estão dentro do ttl
+        None se o projeto nunca foi guardado
+    """
+
+    # slugs do modrinth são sempre minúsculos, mas a api aceita qualquer forma
+    index = _get_project_index(cache_root)
+    project_id = index.get(slug) or index.get(slug.lower(), slug)
+    entry = read_json(cache_root / 'projects' / f'{project_id}.json')
+
+    data = entry.get('data')
+    if not data:
+        return
+
+    age = time.time() - entry.get('fetched_at', 0)
+    fresh = age < entry.get('ttl', PROJECT_TTL)
+
+    return data, fresh
+
+def write_project_cache(data: dict, cache_root: Path, ttl: int = PROJECT_TTL):
+    """
+    guarda os dados gerais de um projeto, exatamente como vieram da api,
+    junto de quando eles foram obtidos e por quanto tempo continuam válidos
+    """
+
+    project_id = data.get('id')
+    file = cache_root / 'projects' / f'{project_id}.json'
+    ensure_directory(file.parent)
+
+    write_json(file, {
+        'fetched_at': time.time(),
+        'ttl': ttl,
+        'data': data
+    })
+
+    _update_project_index(cache_root, project_id, data.get('slug'))
+
+def version_list_cache_file(
+    cache_root: Path,
+    project_id: str,
+    game_version: str | None,
+    loaders: list[str] | None
+    ) -> Path:
+    """
+    caminho do cache de uma lista de versões filtrada
     
-    return version_list
+    os arquivos são nomeados pelo id do projeto, que ao contrário do slug nunca muda,
+    seguido dos filtros. ex: version-lists/AANobbMI@1.20.1+fabric.json
+    """
+
+    key = project_id + _version_list_key(game_version, loaders)
+
+    file = cache_root / 'version-lists' / f'{key}.json'
+    ensure_directory(file.parent)
+
+    return file
+
+def get_cached_version_list_entry(
+    project: str,
+    cache_root: Path,
+    game_version: str | None = None,
+    loaders: list[str] | None = None
+    ) -> tuple[list[Version], dict[str, str]]:
+    """
+    obtém uma lista de versões do cache sem precisar percorrer o diretório inteiro
+    o caminho é montado direto a partir do id e dos filtros
+
+    args:
+        project:
+            id ou slug do projeto
+            se for um slug, o id correspondente é buscado no índice
+
+    returns:
+        tupla com a lista de versões e os validadores http (etag, last-modified)
+        da resposta que gerou ela, usados pra revalidar o cache com o modrinth
+    """
 
-def write_version_list_cache(version_list: list[Version], file: Path):
+    # tentar primeiro como id, e se não existir, traduzir pelo índice
+    file = version_list_cache_file(cache_root, project, game_version, loaders)
+    if not file.is_file():
+        project_id = _get_project_index(cache_root).get(project)
+        if project_id is None:
+            return [], {}
+
+        file = version_list_cache_file(cache_root, project_id, game_version, loaders)
+
+    # arquivos antigos guardavam só a lista, sem validadores nem índice
+    data = read_json(file)
+    validators = {}
+    index = release_index = None
+    if isinstance(data, dict):
+        validators = data.get('validators', {})
+        index = data.get('index')
+        release_index = data.get('release_index')
+        data = data.get('versions')
+
+    if not isinstance(data, list) or len(data) == 0:
+        return [], validators
+
+    version_list = refine_version_list(
+        data=data, project_id=data[0].get('project_id'),
+        index=index, release_index=release_index
+    )
+    return version_list, validators
+
+def write_version_list_cache(
+    version_list: list[Version],
+    project: Project,
+    cache_root: Path,
+    game_version: str | None = None,
+    loaders: list[str] | None = None,
+    validators: dict[str, str] | None = None
+    ):
     """
     converte uma lista de Version pra um dicionário comum
-    e escreve esses dados num json
+    e escreve esses dados num json, registrando o slug do projeto no índice
+
+    args:
+        validators:
+            etag e last-modified da resposta da api, se ela tiver mandado
     """
 
+    file = version_list_cache_file(cache_root, project.id, game_version, loaders)
+
+    # o índice vai junto, pra que a próxima leitura não precise montar ele de novo
+    if not isinstance(version_list, VersionList):
+        version_list = VersionList(version_list)
+
     dictfied = [ asdict(v) for v in version_list ]
-    write_json(file, dictfied)
\ No newline at end of file
+    write_json(file, {
+        'validators': validators or {},
+        'versions': dictfied,
+        'index': version_list.index,
+        'release_index': version_list.release_index
+    })
+
+    _update_project_index(cache_root, project.id, project.slug)
+
+def _negative_key(slug: str, game_version: str, loader: str) -> str:
+    return f'{slug}@{game_version}+{loader}'
+
+def _get_negative_cache(cache_root: Path) -> dict[str, dict]:
+    """
+    lido do disco uma vez e depois mantido em memória, igual ao índice de projetos
+    """
+
+    cache = _negatives.get(cache_root)
+    if cache is None:
+        cache = read_json(cache_root / NEGATIVE_CACHE)
+        _negatives[cache_root] = cache
+
+    return cache
+
+def get_negative_result(cache_root: Path, slug: str, game_version: str, loader: str) -> str | None:
+    """
+    returns:
+        o motivo guardado de um projeto não ter sido resolvido pra essa versão e loader,
+        ou None se não houver nada guardado ou se já tiver passado do ttl
+    """
+
+    with _negative_lock:
+        entry = _get_negative_cache(cache_root).get(_negative_key(slug, game_version, loader))
+
+    if entry is None or time.time() >= entry.get('expires_at', 0):
+        return
+
+    return entry.get('reason')
+
+def write_negative_result(
+    cache_root: Path,
+    slugs: list[str],
+    game_version: str,
+    loader: str,
+    reason: str,
+    ttl: int = NEGATIVE_TTL
+    ):
+    """
+    guarda que um projeto não pôde ser resolvido, pra que as próximas execuções
+    não perguntem de novo pra api antes do ttl passar
+
+    args:
+        slugs:
+            todos os identificadores do projeto (slug e id, quando conhecidos)
+
+        reason:
+            só usado nos logs. ex: 'slug inexistente'
+    """
+
+    expires_at = time.time() + ttl
+
+    with _negative_lock:
+        cache = _get_negative_cache(cache_root)
+
+        # entradas vencidas são descartadas sempre que o arquivo é reescrito
+        now = time.time()
+        for key in [ k for k, e in cache.items() if now >= e.get('expires_at', 0) ]:
+            del cache[key]
+
+        for s in slugs:
+            cache[_negative_key(s, game_version, loader)] = {
+                'reason': reason,
+                'expires_at': expires_at
+            }
+
+        ensure_directory(cache_root)
+        write_json(cache_root / NEGATIVE_CACHE, cache)
+
+def clear_negative_result(cache_root: Path, slugs: list[str], game_version: str, loader: str):
+    """
+    remove entradas de projetos que acabaram de ser resolvidos
+    normalmente só acontece quando o cache negativo foi ignorado
+    """
+
+    with _negative_lock:
+        cache = _get_negative_cache(cache_root)
+
+        keys = [ _negative_key(s, game_version, loader) for s in slugs ]
+        keys = [ k for k in keys if k in cache ]
+        if len(keys) == 0:
+            return
+
+        for k in keys:
+            del cache[k]
+
+        write_json(cache_root / NEGATIVE_CACHE, cache)
+
+def get_cached_version(version_id: str, cache_root: Path) -> Version | None:
+    """
+    obtém uma versão específica guardada por write_version_cache
+    """
+
+    data = read_json(cache_root / 'versions' / f'{version_id}.json')
+    if not data:
+        return
+
+    return refine_version_list([data], data.get('project_id'))[0]
+
+def write_version_cache(version: Version, cache_root: Path):
+    file = cache_root / 'versions' / f'{version.id}.json'
+    ensure_directory(file.parent)
+    write_json(file, asdict(version))
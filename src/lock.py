@@ -0,0 +1,80 @@
+from pathlib import Path
+from dataclasses import asdict
+import hashlib
+import json
+
+from .utils import write_json, read_json, File, ResolvedProject
+from . import logger
+
+LOCK_SUFFIX = '.lock.json'
+LOCK_FORMAT = 1
+
+def lock_file_for(modpack: Path) -> Path:
+    """
+    modpacks/visuals.json -> modpacks/visuals.lock.json
+    """
+
+    return modpack.with_name(modpack.stem + LOCK_SUFFIX)
+
+def modpack_digest(data: dict) -> str:
+    """
+    hash de tudo no modpack que muda o resultado da resolução
+    se ele for diferente do guardado no lockfile, o lockfile está desatualizado
+    """
+
+    relevant = {
+        'version': data.get('version'),
+        'loader': data.get('loader'),
+        'mods': data.get('mods', []),
+        'resourcepacks': data.get('resourcepacks', [])
+    }
+
+    encoded = json.dumps(relevant, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def write_lock(modpack: Path, data: dict, resolved: list[ResolvedProject]) -> Path:
+    """
+    escreve o lockfile de um modpack com a versão exata de cada projeto e dependência
+    """
+
+    file = lock_file_for(modpack)
+
+    write_json(file, {
+        'format': LOCK_FORMAT,
+        'modpack_digest': modpack_digest(data),
+        'version': data.get('version'),
+        'loader': data.get('loader'),
+        'projects': [ asdict(r) for r in resolved ]
+    })
+
+    return file
+
+def read_lock(modpack: Path, data: dict) -> list[ResolvedProject] | None:
+    """
+    lê o lockfile de um modpack
+
+    returns:
+        os projetos fixados, ou None se o lockfile não existir
+        ou não corresponder mais ao conteúdo atual do modpack
+    """
+
+    file = lock_file_for(modpack)
+    if not file.is_file():
+        return
+
+    lock = read_json(file)
+    if lock.get('format') != LOCK_FORMAT:
+        logger.warning('lockfile em formato antigo, ignorando', title=file.name)
+        return
+
+    if lock.get('modpack_digest') != modpack_digest(data):
+        logger.warning('lockfile desatualizado, o modpack mudou desde que ele foi gerado', title=file.name)
+        return
+
+    resolved = []
+    for p in lock.get('projects', []):
+        p = dict(p)
+        p['file'] = File(**p.get('file'))
+        resolved.append(ResolvedProject(**p))
+
+    return resolved
@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+import threading
 
 from rich.console import Console
 from rich.text import Text
@@ -27,6 +28,10 @@ DEFAULT_NERDFONT_ICON = '󱍔'
 USE_CUSTOM_COLORS = True
 SHOW_DEBUG = False
 
+# só um spinner pode ocupar o terminal por vez
+# downloads paralelos que não conseguirem ele só logam quando terminarem
+_spinner_lock = threading.Lock()
+
 def _get_level_color(level: str, custom: bool = True):
     """
     args:
@@ -123,23 +128,38 @@ def spinner(msg = 'iniciando download...', title: str | None = None, details: st
     while_downloading.append(msg)
     _resolve_details(while_downloading)
 
-    # criar o spinner
-    spinner = Spinner('dots', while_downloading, style=style)
+    # mensagem depois que o download termina
+    # o ícone é adicionado pra tomar o lugar que antes era ocupado pelo spinner
+    def _after_downloaded() -> Text:
+        after_downloaded = Text()
+        _resolve_icon(after_downloaded)
+        _resolve_title(after_downloaded)
+        after_downloaded.append('download concluído')
+        _resolve_details(after_downloaded)
+        return after_downloaded
+
     console = Console()
-    
-    with Live(spinner, refresh_per_second=10, console=console) as live:
+
+    # se outro download já estiver com o spinner, não disputa o terminal com ele
+    if not _spinner_lock.acquire(blocking=False):
         try:
             yield
         finally:
-            # muda o texto de um spinner pra um estático depois de finalizar o download
-            # o ícone é adicionado pra tomar o lugar que antes era ocupado pelo spinner
-            after_downloaded = Text()
-            _resolve_icon(after_downloaded)
-            _resolve_title(after_downloaded)
-            after_downloaded.append('download concluído')
-            _resolve_details(after_downloaded)
-
-            live.update(after_downloaded)
+            console.print(_after_downloaded())
+        return
+
+    # criar o spinner
+    spinner = Spinner('dots', while_downloading, style=style)
+
+    try:
+        with Live(spinner, refresh_per_second=10, console=console) as live:
+            try:
+                yield
+            finally:
+                # muda o texto de um spinner pra um estático depois de finalizar o download
+                live.update(_after_downloaded())
+    finally:
+        _spinner_lock.release()
 
 def modpack_init(name: str, mod_count: int, resourcepack_count: int, version: str, loader: str):
     # logger especial só pro momento em que uma leitura de modpack começa
@@ -2,10 +2,13 @@ from pathlib import Path
 
 import click
 
-from .modrinth import resolve_project_downloading, get_project, get_version_list
+from .modrinth import get_projects, resolve_closure, install_resolved_projects, skip_known_unresolved, remember_unresolved, find_compatible_versions
+from .lock import read_lock, write_lock
+from .reconcile import plan_reconcile, log_plan as log_reconcile_plan, remove_stale
+from .plan import build_plan, plan_from_resolved, log_plan
 from .parser import get_compatible_version
-from .utils import read_json, DOTMINECRAFT, Context, DotMinecraft
-from . import logger
+from .utils import read_json, DOTMINECRAFT, Context, DotMinecraft, InstallPlan
+from . import logger, memo, session, replay
 
 dir_mods = DOTMINECRAFT / 'mods'
 dir_resourcepacks = DOTMINECRAFT / 'resourcepacks'
@@ -39,16 +42,56 @@ def _is_modpack_valid(modpack: Path) -> bool:
     return True
 
 @click.group
-def modtaur_cli():
-    pass
+@click.option('--record', type=click.Path(file_okay=False, path_type=Path), help='grava todas as respostas do modrinth nesse diretório')
+def modtaur_cli(record: Path | None = None):
+    """
+    a api usada pode ser trocada pela variável de ambiente MODTAUR_API_BASE
+    """
+
+    if record is not None:
+        session.record_to(record)
+
+@modtaur_cli.command(name='stand-in')
+@click.argument('fixtures', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', '-p', type=int, default=8080, show_default=True)
+@click.option('--latency', type=float, default=0, show_default=True, help='segundos de espera antes de cada resposta')
+@click.option('--bandwidth', type=int, default=None, help='bytes por segundo de cada resposta')
+def stand_in(fixtures: Path, host: str, port: int, latency: float, bandwidth: int | None):
+    """
+    serve fixtures gravadas com --record como se fosse o modrinth
+
+    pra usar, rode o modtaur com MODTAUR_API_BASE=http://host:porta/v2
+    """
+
+    server = replay.serve(fixtures, host, port, latency, bandwidth)
+    logger.info(f'servindo {fixtures} em http://{host}:{port}/v2', title='stand-in')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
 
 @modtaur_cli.command(name='verify')
 @click.argument('modpack')
 @click.option('--version', '-v')
 @click.option('--loader', '-l')
-def verify_compatiblity(modpack: str, version: str | None, loader: str | None):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=4, show_default=True)
+@click.option('--refresh', is_flag=True, default=False, help='ignora o cache de projetos')
+@click.option('--offline', is_flag=True, default=False, help='usa só o que já está no cache, sem acessar a rede')
+@click.option('--retry-unresolved', is_flag=True, default=False, help='ignora o cache de projetos que falharam recentemente')
+def verify_compatiblity(
+    modpack: str,
+    version: str | None,
+    loader: str | None,
+    jobs: int = 4,
+    refresh: bool = False,
+    offline: bool = False,
+    retry_unresolved: bool = False
+    ):
     """
     verifica a compatibilidade dos mods de um modpack em relação a uma versão e loader
+    um mod só é compatível se alguma versão dele suportar as duas coisas ao mesmo tempo
 
     args:
         version:
@@ -59,9 +102,24 @@ def verify_compatiblity(modpack: str, version: str | None, loader: str | None):
 
         ambos os argumentos a cima, se não especificados,
         o valor usado vai ser o que está dentro do modpack
+
+        jobs:
+            quantos mods são verificados ao mesmo tempo
+
+        refresh:
+            ignora o cache de projetos e de listas de versões
+
+        offline:
+            usa só os dados de projetos e listas de versões já em cache, mesmo que vencidos
+            projetos que não estão no cache são listados como erro
+
+        retry_unresolved:
+            pergunta de novo pra api por slugs que não existiam da última vez
     """
     
     logger.debug(modpack, title='verify')
+    memo.clear_all()
+    session.set_offline(offline)
     
     modpack = _normalize_json_path(modpack)
 
@@ -75,32 +133,227 @@ def verify_compatiblity(modpack: str, version: str | None, loader: str | None):
     if not loader:
         loader = ctx.loader
 
-    for m in data.get('mods'):
-        proj = get_project(m)
+    # o cache negativo é separado por versão e loader, então usa os que vão ser verificados
+    ctx.version = version
+    ctx.loader = loader
+    ctx.retry_unresolved = retry_unresolved
+    ctx.jobs = jobs
+
+    mods = skip_known_unresolved(data.get('mods', []), ctx)
+
+    not_found = set()
+    projects = get_projects(mods, cache_root=ctx.cache_root, refresh=refresh, not_found=not_found)
+    remember_unresolved(not_found, ctx, 'slug inexistente')
 
-        compatible = False
-        if version in proj.game_versions and loader in proj.loaders:
-            compatible = True
+    # cada projeto é verificado uma vez só, mesmo se listado por slug e por id
+    checked = list({ projects[m].id: projects[m] for m in mods if m in projects }.values())
+    results = dict(zip(( p.id for p in checked ), find_compatible_versions(checked, ctx, refresh)))
 
-        details = f'versão {version} : loader {loader}'
+    details = f'versão {version} : loader {loader}'
+    for m in mods:
+        proj = projects.get(m)
+        if proj is None:
+            continue
 
-        if not compatible:
+        result = results.get(proj.id)
+        if result is None:
+            continue
+
+        compatible, definitive = result
+        if compatible is not None:
+            logger.success(f' compatível ', title=m, details=f'{details} : {compatible.id}')
+        elif definitive:
             logger.error(f'incompatível', title=m, details=details)
         else:
-            logger.success(f' compatível ', title=m, details=details)
+            logger.warning(f'não verificado, lista de versões indisponível', title=m, details=details)
+
+    memo.log_stats()
+
+@modtaur_cli.command(name='lock')
+@click.argument('modpack')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=4, show_default=True)
+@click.option('--refresh', is_flag=True, default=False, help='ignora o cache de projetos')
+@click.option('--retry-unresolved', is_flag=True, default=False, help='ignora o cache de projetos que falharam recentemente')
+def lock_modpack(modpack: str, jobs: int = 4, refresh: bool = False, retry_unresolved: bool = False):
+    """
+    resolve todos os projetos e dependências de um modpack e fixa o resultado num lockfile
+
+    o lockfile fica do lado do modpack (visuals.json -> visuals.lock.json)
+    e guarda a versão, url, nome, tamanho e hashes do arquivo de cada projeto
+    enquanto o modpack não mudar, o load instala direto dele sem consultar a api
+
+    se algum projeto não puder ser resolvido, nada é escrito
+    """
+
+    logger.debug(modpack, title='lock')
+    memo.clear_all()
+
+    modpack = _normalize_json_path(modpack)
+
+    if not _is_modpack_valid(modpack):
+        return
+
+    data = read_json(modpack)
+    ctx = _context_from_modpack_data(data)
+    ctx.jobs = jobs
+    ctx.refresh = refresh
+    ctx.retry_unresolved = retry_unresolved
+
+    mods = data.get('mods', [])
+    resourcepacks = data.get('resourcepacks', [])
+
+    resolved = resolve_closure(mods, ctx) + resolve_closure(resourcepacks, ctx)
+
+    # o load confia no lockfile sem resolver nada, então um lockfile incompleto
+    # instalaria o modpack faltando projetos sem nenhum aviso
+    if ctx.unresolved:
+        for u in sorted(ctx.unresolved):
+            logger.error('não resolvido', title=u)
+        logger.error('o lockfile não foi escrito', title=modpack.stem)
+        memo.log_stats()
+        return
+
+    lock = write_lock(modpack, data, resolved)
+
+    logger.success(f'{len(resolved)} projetos fixados em {lock}', title=modpack.stem)
+    memo.log_stats()
+
+def _plan_modpack(
+    modpack: Path,
+    data: dict,
+    ctx: Context,
+    types: list[str],
+    prefetch: bool = False
+    ) -> InstallPlan:
+    """
+    monta o plano de instalação dos tipos de projeto pedidos
+    com um lockfile atualizado, nada precisa ser resolvido
+    """
+
+    resolved = read_lock(modpack, data)
+    if resolved is not None:
+        logger.info(f'usando o lockfile', title=modpack.stem)
+        return plan_from_resolved([ r for r in resolved if r.project_type in types ], ctx, prefetch=prefetch)
+
+    slugs = []
+    if 'mod' in types:
+        slugs += data.get('mods', [])
+    if 'resourcepack' in types:
+        slugs += data.get('resourcepacks', [])
+
+    return build_plan(slugs, ctx, prefetch=prefetch)
+
+def _types_to_apply(apply_mods: bool, apply_resourcepacks: bool) -> list[str]:
+    types = []
+    if apply_mods:
+        types.append('mod')
+    if apply_resourcepacks:
+        types.append('resourcepack')
+
+    return types
+
+@modtaur_cli.command(name='plan')
+@click.argument('modpack')
+@click.option('--apply-mods', '-mod', is_flag=True, default=True)
+@click.option('--apply-resourcepacks', '-res', is_flag=True, default=False)
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=4, show_default=True)
+@click.option('--refresh', is_flag=True, default=False, help='ignora o cache de projetos')
+@click.option('--offline', is_flag=True, default=False, help='usa só o que já está no cache, sem acessar a rede')
+@click.option('--retry-unresolved', is_flag=True, default=False, help='ignora o cache de projetos que falharam recentemente')
+def plan_modpack(
+    modpack: str,
+    apply_mods: bool = True,
+    apply_resourcepacks: bool = False,
+    jobs: int = 4,
+    refresh: bool = False,
+    offline: bool = False,
+    retry_unresolved: bool = False
+    ):
+    """
+    mostra o que um load faria, sem baixar nem instalar nada
+
+    o plano inclui quantos arquivos já estão no cache e só vão ser copiados,
+    quantos e quantos bytes vão ser baixados, e quais projetos não puderam ser resolvidos
+    """
+
+    logger.debug(modpack, title='plan')
+    memo.clear_all()
+    session.set_offline(offline)
+
+    modpack = _normalize_json_path(modpack)
+
+    if not _is_modpack_valid(modpack):
+        return
+
+    data = read_json(modpack)
+    ctx = _context_from_modpack_data(data)
+    ctx.jobs = jobs
+    ctx.refresh = refresh
+    ctx.retry_unresolved = retry_unresolved
+
+    plan = _plan_modpack(modpack, data, ctx, _types_to_apply(apply_mods, apply_resourcepacks))
+
+    for r in plan.to_download:
+        details = f'{r.file.filename} : {r.file.size or "?"} bytes'
+        logger.info('baixar', title=r.slug, details=details)
+    for r in plan.cached:
+        logger.success('no cache', title=r.slug, details=r.file.filename)
+
+    log_plan(plan, title=modpack.stem)
+    memo.log_stats()
 
 @modtaur_cli.command(name='load')
 @click.argument('modpack')
 @click.option('--delete-previous', '-del', is_flag=True, default=True)
 @click.option('--apply-mods', '-mod', is_flag=True, default=True)
 @click.option('--apply-resourcepacks', '-res', is_flag=True, default=False)
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=4, show_default=True)
+@click.option('--refresh', is_flag=True, default=False, help='ignora o cache de projetos')
+@click.option('--reconcile', '-rec', is_flag=True, default=False, help='só troca os arquivos que mudaram')
+@click.option('--ignore-unresolved', is_flag=True, default=False, help='instala mesmo com projetos não resolvidos ou não baixados')
+@click.option('--offline', is_flag=True, default=False, help='usa só o que já está no cache, sem acessar a rede')
+@click.option('--retry-unresolved', is_flag=True, default=False, help='ignora o cache de projetos que falharam recentemente')
 def load_modpack(
     modpack: str,
     delete_previous: bool = True,
     apply_mods: bool = True,
-    apply_resourcepacks: bool = False
+    apply_resourcepacks: bool = False,
+    jobs: int = 4,
+    refresh: bool = False,
+    reconcile: bool = False,
+    ignore_unresolved: bool = False,
+    offline: bool = False,
+    retry_unresolved: bool = False
     ):
+    """
+    instala os mods e resourcepacks de um modpack na .minecraft
+
+    o modpack inteiro é resolvido antes da .minecraft ser tocada, com os arquivos
+    que faltam já sendo baixados pro cache nesse meio tempo
+    se algum projeto não puder ser resolvido ou baixado, o load desiste sem mudar nada
+
+    args:
+        reconcile:
+            em vez de apagar tudo e instalar de novo, compara o que o modpack precisa
+            com o que já está instalado, removendo só os arquivos que sobram
+            e instalando só os que faltam. o --delete-previous é ignorado nesse modo
+
+        ignore_unresolved:
+            instala o resto do modpack mesmo com projetos que não puderam ser resolvidos
+            ou cujo arquivo não pôde ser baixado
+
+        offline:
+            resolve e instala só com o que já está no cache, sem acessar a rede
+            tudo que o cache não cobre aparece no plano, antes de qualquer coisa ser instalada
+
+        retry_unresolved:
+            projetos que não existiam ou não tinham versão compatível da última vez
+            são pulados por um tempo. isso pergunta por eles de novo pra api
+    """
+
     logger.debug(modpack, title='load')
+    memo.clear_all()
+    session.set_offline(offline)
     
     # obter os dados do modpack
     modpack = _normalize_json_path(modpack)
@@ -117,6 +370,9 @@ def load_modpack(
     resourcepacks = data.get('resourcepacks', [])
 
     ctx = _context_from_modpack_data(data)
+    ctx.jobs = jobs
+    ctx.refresh = refresh
+    ctx.retry_unresolved = retry_unresolved
     dotminecraft = ctx.dotminecraft
 
     # manipulação de diretórios
@@ -130,9 +386,32 @@ def load_modpack(
     if len(minecraft_dirs) == 0:
         return
 
-    # limpar os diretórios básicos se assim especificado
-    for d in minecraft_dirs:
-        if delete_previous:
+    types = _types_to_apply(apply_mods, apply_resourcepacks)
+
+    # dados extras pro log
+    logger.modpack_init(
+        name=modpack.stem, version=version, loader=loader,
+        mod_count=len(mods), resourcepack_count=len(resourcepacks)
+    )
+
+    # resolver tudo antes de tocar na .minecraft
+    plan = _plan_modpack(modpack, data, ctx, types, prefetch=True)
+    log_plan(plan, title=modpack.stem)
+
+    if not plan.satisfiable and not ignore_unresolved:
+        logger.error('nada foi instalado. use --ignore-unresolved pra instalar o resto mesmo assim', title=modpack.stem)
+        return
+
+    resolved = [ r for r in plan.resolved if r not in plan.unavailable ]
+
+    if reconcile:
+        reconcile_plan = plan_reconcile(resolved, types, ctx)
+        log_reconcile_plan(reconcile_plan, title=modpack.stem)
+        remove_stale(reconcile_plan)
+        resolved = reconcile_plan.add
+    elif delete_previous:
+        # limpar os diretórios básicos se assim especificado
+        for d in minecraft_dirs:
             logger.info('deletando todos os mods anteriores')
 
             for f in d.rglob('*'):
@@ -140,22 +419,10 @@ def load_modpack(
 
             logger.success('mods deletados')
 
-    # dados extras pro log
-    logger.modpack_init(
-        name=modpack.stem, version=version, loader=loader,
-        mod_count=len(mods), resourcepack_count=len(resourcepacks)
-    )
+    # os arquivos vêm do cache, onde a maioria já foi baixada durante o plano
+    install_resolved_projects(resolved, ctx)
 
-    # baixar pela internet ou pegar arquivos já existentes
-    # que correspondem a cada mod especificado no arquivo
-    if apply_mods:
-        for m in mods:
-            project = get_project(m)
-            resolve_project_downloading(project, ctx)
-    if apply_resourcepacks:
-        for r in resourcepacks:
-            project = get_project(r)
-            resolve_project_downloading(project, ctx)
+    memo.log_stats()
 
 if __name__ == '__main__':
     modtaur_cli()
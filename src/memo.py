@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+
+from . import logger
+
+DEFAULT_MAXSIZE = 512
+
+# todos os memos criados, pra que possam ser limpos ou inspecionados juntos
+_memos: list['Memo'] = []
+
+class Memo:
+    """
+    cache em memória com limite de tamanho, descartando o item usado há mais tempo (lru)
+
+    também junta chamadas idênticas que acontecem ao mesmo tempo:
+    se uma thread pede algo que outra já está buscando, ela espera o resultado
+    da primeira em vez de fazer uma segunda requisição
+
+    args:
+        name:
+            usado só nos logs
+
+        maxsize:
+            quantidade máxima de itens guardados
+    """
+
+    def __init__(self, name: str, maxsize: int = DEFAULT_MAXSIZE):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._data: OrderedDict = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        _memos.append(self)
+
+    def _store(self, key: str, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._store(key, value)
+
+    def call(self, key: str, function):
+        """
+        retorna o valor guardado em key, ou chama function pra obtê-lo
+
+        resultados None não são guardados, já que normalmente indicam
+        uma falha de rede que pode não se repetir na próxima tentativa
+        """
+
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+
+            # outra thread já está buscando esse mesmo valor
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = function()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if value is not None:
+                self._store(key, value)
+
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> str:
+        return f'{self.hits} hits, {self.misses} misses, {len(self._data)}/{self.maxsize} itens'
+
+def clear_all():
+    """
+    limpa todos os memos, normalmente no início de cada comando
+    """
+
+    for m in _memos:
+        m.clear()
+
+def log_stats():
+    for m in _memos:
+        logger.debug(m.stats(), title=m.name)
@@ -1,11 +1,41 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import requests
-import shutil
+import json
 
-from .utils import Context, API_BASE, HEADERS, Project, Version, Dependency, File, ensure_directory
-from .parser import get_compatible_version, get_primary_jar, refine_version_list
-from .cache import get_cached_version_list, write_cache, write_version_list_cache
-from . import logger
+from .utils import read_json, write_json, Context, API_BASE, Project, Version, Dependency, File, ResolvedProject, DependencyGraph, ensure_directory
+from .parser import get_compatible_version, get_primary_file, refine_version_list
+from .cache import get_cached_version_list_entry, write_cache, write_version_list_cache, get_cached_project_data, write_project_cache, get_negative_result, write_negative_result, clear_negative_result, get_cached_version, write_version_cache
+from .memo import Memo
+from .store import get_blob, add_blob, seal_blob, is_blob_sealed, install_file, find_cached_file, register_cached_file, forget_cached_file, new_digest, file_digest, check_file
+from . import logger, session
+
+# tentativas de um mesmo download antes de desistir
+# cada uma continua de onde a anterior parou
+DOWNLOAD_ATTEMPTS = 3
+
+# arquivos a partir desse tamanho são baixados em vários pedaços ao mesmo tempo,
+# se o servidor aceitar Range. abaixo disso o custo das conexões extras não compensa
+PARALLEL_THRESHOLD = 32 * 1024 * 1024
+PARALLEL_SEGMENTS = 4
+
+class IncompleteDownload(Exception):
+    pass
+
+# quantos projetos são pedidos por requisição no endpoint /projects
+# o limite real é o tamanho da url, então slugs longos precisam de um valor conservador
+PROJECTS_CHUNK_SIZE = 100
+
+# projetos já obtidos nessa execução, pelo identificador pedido e pelos argumentos de get_projects
+_project_memo = Memo('get_projects')
+
+# listas de versões já obtidas nessa execução, por projeto e filtros
+_version_list_memo = Memo('fetch_version_list')
+
+# projetos que já estão sendo revalidados em segundo plano
+_revalidating: set[tuple[Path, str]] = set()
+_revalidating_lock = threading.Lock()
 
 def _load_depencencies(raw_deps: list[dict]) -> list[Dependency]:
     """
@@ -38,79 +68,303 @@ def _load_depencencies(raw_deps: list[dict]) -> list[Dependency]:
 
         d = Dependency(
             project_id=project_id,
-            dependency_type=raw.get('dependency_type')
+            dependency_type=raw.get('dependency_type'),
+            version_id=raw.get('version_id')
         )
         dependencies.append(d)
 
     return dependencies
 
-def _request_project_data(slug: str, section: str | None):
+def _send_project_request(
+    slug: str,
+    section: str | None,
+    params: dict | None = None,
+    headers: dict | None = None
+    ) -> requests.Response | None:
     """
-    obtém os dados de um projeto do modrinth
-    projetos se referem a mods, resourcepacks e datapacks
-
-    eles são requisitados pela url da api + /version
-    isso retorna um array com dicionários que representam cada versão do mod
-
-    as principais chaves dentro de cada um desses dicionários são:
-        game_versions:
-            versões em que o mod é compatível
-        
-        loaders:
-            quais loaders podem ser usados pra rodar o mod
-        
-        files:
-            contém os arquivos do mod
-
-            na maioria das vezes um mod é contido em um único .jar,
-            mas alguns projetos podem ter múltiplos arquivos nessa lista,
-            como por exemplo, código fonte, licenças etc.
-
-            o que diferencia o .jar relevante dos adicionais é a chave 'primary'
-            se ela for true, significa que aquele é o .jar que realmente é o mod
-            se ela não for true em nenhum dos itens, como fallback, pode se assumir
-            que o primerio item da lista de ser considerado como primário
-        
-        dependencies:
-            contém dependencias necessárias pro funcionamento do mod pai
+    faz uma requisição pra um projeto do modrinth e retorna a resposta crua
+    isso permite ler os headers e o status, como o 304 de uma requisição condicional
 
-            elas são listadas contendo o id dos projetos delas em vez do slug,
-            mas isso funciona do mesmo modo que um slug funcionaria
-    
     args:
         slug:
-            identificador do mod. pode ser tanto um slug literal, como 'sodium'
+            identificador do projeto. pode ser tanto um slug literal, como 'sodium'
             ou um id gerado aleatoriamente, como 'AANobbMI'
-        
+
         section:
-            define qual de dados seção vai ser obtida
-            'version' dá acesso a todas as versões que o mod já teve
+            'version' pra lista de versões, 'dependencies' pras dependências
             a ausência desse valor resulta em dados gerais sobre o projeto
-    """
 
-    logger.debug(slug, title='request project data')
+        params:
+            parâmetros de query repassados pra api, tipo os filtros de versão
+
+    returns:
+        a resposta, ou None se a requisição falhou (o erro já é logado aqui)
+    """
 
     # construir a url que dá acesso a api do modrinth
     project = f'{API_BASE}/project/{slug}'
-    if section == 'version':
-        project += '/version'
+    if section in ('version', 'dependencies'):
+        project += f'/{section}'
 
     try:
-        response = requests.get(project, headers=HEADERS)
+        response = session.get(project, params=params, headers=headers)
         response.raise_for_status() # evidencia erros caso eles ocorram
 
-        response = response.json() # transforma a resposta de texto em json
-        logger.debug('informações do projeto obtidas', title=slug)
-
         return response
     except requests.exceptions.HTTPError:
         logger.error(f'não foi possível obter os dados do projeto. isso provavelmente aconteceu por um slug inexistente', title=slug)
         return
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        logger.error(f'o modrinth não respondeu a tempo', title=slug)
+        return
+
+def _request_projects_data(slugs: list[str]) -> tuple[list[dict], list[str]]:
+    """
+    obtém os dados gerais de vários projetos de uma vez pelo endpoint /projects
+
+    a lista é dividida em pedaços de PROJECTS_CHUNK_SIZE, então um modpack inteiro
+    custa uma ou duas requisições em vez de uma por projeto
+
+    slugs inexistentes são simplesmente omitidos pela api, sem erro
+
+    returns:
+        os dados recebidos, e os slugs que não puderam ser perguntados por falha na requisição
+        assim quem chama consegue diferenciar um slug inexistente de uma falha de rede
+    """
+
+    logger.debug(f'{len(slugs)} projetos', title='request projects data')
+
+    data = []
+    failed = []
+    for i in range(0, len(slugs), PROJECTS_CHUNK_SIZE):
+        chunk = slugs[i:i + PROJECTS_CHUNK_SIZE]
+
+        try:
+            response = session.get(f'{API_BASE}/projects', params={'ids': json.dumps(chunk)})
+            response.raise_for_status()
+            data.extend(response.json())
+        except requests.exceptions.HTTPError:
+            logger.error(f'não foi possível obter os dados de {len(chunk)} projetos', title='projects')
+            failed.extend(chunk)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            logger.error(f'o modrinth não respondeu a tempo', title='projects')
+            failed.extend(chunk)
+
+    return data, failed
+
+def _request_versions_data(version_ids: list[str]) -> list[dict]:
+    """
+    obtém várias versões específicas de uma vez pelo endpoint /versions
+    igual a _request_projects_data, ids inexistentes são omitidos pela api
+    """
+
+    logger.debug(f'{len(version_ids)} versões', title='request versions data')
+
+    data = []
+    for i in range(0, len(version_ids), PROJECTS_CHUNK_SIZE):
+        chunk = version_ids[i:i + PROJECTS_CHUNK_SIZE]
+
+        try:
+            response = session.get(f'{API_BASE}/versions', params={'ids': json.dumps(chunk)})
+            response.raise_for_status()
+            data.extend(response.json())
+        except requests.exceptions.HTTPError:
+            logger.error(f'não foi possível obter os dados de {len(chunk)} versões', title='versions')
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            logger.error(f'o modrinth não respondeu a tempo', title='versions')
+
+    return data
+
+def get_versions(version_ids: list[str], cache_root: Path) -> dict[str, Version]:
+    """
+    obtém versões pelo id, primeiro pelo cache em disco e o resto numa requisição em lote
+    uma versão publicada nunca muda, então o cache delas não tem ttl
+
+    no modo offline, só as versões em cache são retornadas
+
+    returns:
+        dicionário de id da versão -> Version, sem as que não foram encontradas
+    """
+
+    versions = {}
+    missing = []
+    for version_id in dict.fromkeys(version_ids):
+        cached = get_cached_version(version_id, cache_root)
+        if cached is None:
+            missing.append(version_id)
+        else:
+            versions[version_id] = cached
+
+    if missing and not session.is_offline():
+        fetched = _request_versions_data(missing)
+        for version in refine_version_list(fetched, None):
+            write_version_cache(version, cache_root)
+            versions[version.id] = version
+
+    return versions
+
+def _download_part(url: str, part: Path, file: File) -> str | None:
+    """
+    baixa url em part, continuando de onde um download anterior parou
+
+    o hash é calculado enquanto os chunks são escritos, sem uma segunda leitura do arquivo
+    quando o download é continuado, só o trecho que já estava no .part é lido de novo
+
+    returns:
+        o hash do arquivo no algoritmo de new_digest, ou None se a api não informou nenhum
+
+    raises:
+        IncompleteDownload se o servidor recusou o range e o .part foi descartado
+    """
+
+    offset = part.stat().st_size if part.is_file() else 0
+
+    # um .part maior que o arquivo esperado não tem como ser aproveitado
+    if file.size is not None and offset > file.size:
+        part.unlink()
+        offset = 0
+
+    if file.size is not None and offset == file.size:
+        digest = new_digest(file)
+        return file_digest(part, digest.name) if digest else None
+
+    headers = { 'Range': f'bytes={offset}-' } if offset else {}
+    down = session.get(url, stream=True, headers=headers) # stream baixa em chunks
+
+    with down:
+        # o .part já tem o arquivo inteiro, ou o servidor mudou o arquivo
+        if down.status_code == 416:
+            logger.debug(f'range não satisfazível, recomeçando: {part.name}', title='download file')
+            part.unlink()
+            raise IncompleteDownload(part.name)
+
+        down.raise_for_status()
+
+        # o servidor ignorou o range e mandou o arquivo desde o começo
+        if offset and down.status_code != 206:
+            offset = 0
+
+        digest = new_digest(file)
+
+        if offset:
+            logger.debug(f'continuando do byte {offset}: {part.name}', title='download file')
+
+            if digest is not None:
+                with part.open('rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+
+        # write bytes, baixa em chunks de 8192 bytes
+        # o with devolve a conexão pro pool depois que o corpo for todo lido
+        with part.open('ab' if offset else 'wb') as dest:
+            for chunk in down.iter_content(chunk_size=8192):
+                dest.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+
+    if digest is not None:
+        return digest.hexdigest()
+
+def _accepts_ranges(url: str) -> bool:
+    try:
+        response = session.head(url, allow_redirects=True)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        return False
+
+    return response.ok and response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+
+def _split_segments(size: int, count: int) -> list[list[int]]:
+    """
+    divide size bytes em count pedaços contínuos
+
+    returns:
+        [início, fim (inclusivo), bytes já escritos] de cada pedaço
+    """
+
+    length = -(-size // count)
+    return [ [start, min(start + length, size) - 1, 0] for start in range(0, size, length) ]
+
+def _download_segment(url: str, part: Path, segment: list[int]):
+    """
+    baixa um pedaço do arquivo direto na posição dele dentro de part
+    segment é atualizado a cada chunk, então uma falha no meio não perde o que já foi escrito
+    """
+
+    start, end, written = segment
+    if start + written > end:
+        return
 
-def download_file(url: str, filename: str, destination_dir: Path):
+    down = session.get(url, stream=True, headers={ 'Range': f'bytes={start + written}-{end}' })
+
+    with down:
+        down.raise_for_status()
+
+        # sem 206 o servidor mandaria o arquivo inteiro, que não cabe no pedaço
+        if down.status_code != 206:
+            raise IncompleteDownload(part.name)
+
+        with part.open('r+b') as dest:
+            dest.seek(start + written)
+            for chunk in down.iter_content(chunk_size=65536):
+                dest.write(chunk)
+                segment[2] += len(chunk)
+
+    if start + segment[2] <= end:
+        raise IncompleteDownload(part.name)
+
+def _download_parallel(url: str, part: Path, file: File):
+    """
+    baixa url em part com PARALLEL_SEGMENTS requisições Range ao mesmo tempo
+
+    part é criado já com o tamanho final e cada pedaço escreve na sua própria posição
+    o progresso de cada um fica em <part>.json enquanto o download não termina,
+    assim uma nova tentativa, ou a próxima execução, baixa só o que faltou
+
+    raises:
+        a primeira falha entre os pedaços, depois de todos terminarem
+    """
+
+    state_file = part.with_name(f'{part.name}.json')
+
+    segments = None
+    if state_file.is_file() and part.is_file() and part.stat().st_size == file.size:
+        segments = read_json(state_file).get('segments')
+
+    if segments is None:
+        segments = _split_segments(file.size, PARALLEL_SEGMENTS)
+        with part.open('wb') as f:
+            f.truncate(file.size)
+    else:
+        logger.debug(f'continuando {part.name}', title='download parallel')
+
+    with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+        futures = [ pool.submit(_download_segment, url, part, s) for s in segments ]
+        errors = [ f.exception() for f in futures if f.exception() is not None ]
+
+    if errors:
+        write_json(state_file, { 'segments': segments })
+        raise errors[0]
+
+    state_file.unlink(missing_ok=True)
+
+def download_file(
+    url: str,
+    filename: str,
+    destination_dir: Path,
+    size: int | None = None,
+    hashes: dict | None = None
+    ) -> Path | None:
     """
     baixa o .jar atribuído a um mod. os valores que identificam esse jar
     devem ter sido anteriormente já extraído dos dados do projeto
+
+    o arquivo é escrito em <filename>.part e só é renomeado pro nome final
+    depois de conferido o tamanho e o hash. se a conexão cair no meio, o download
+    continua de onde parou com um header Range, tanto em uma nova tentativa
+    quanto na próxima vez que o mesmo arquivo for baixado pro mesmo diretório
+
+    arquivos a partir de PARALLEL_THRESHOLD são baixados em vários pedaços
+    ao mesmo tempo quando o servidor anuncia Accept-Ranges
     
     args:
         url:
@@ -125,6 +379,12 @@ def download_file(url: str, filename: str, destination_dir: Path):
         destination_dir:
             lugar de destino do arquivo baixado
             geralmente é a .minecraft/mods
+
+        size, hashes:
+            tamanho e hashes informados pela api, usados pra conferir o arquivo
+
+    returns:
+        o caminho do arquivo baixado, ou None se o download falhou
     """
 
     logger.debug(url, title='download file')
@@ -133,33 +393,219 @@ def download_file(url: str, filename: str, destination_dir: Path):
         logger.error(f'{destination_dir} não é um diretório')
         return
     destination = destination_dir / filename
-    
-    down = requests.get(url, stream=True) # stream baixa em chunks
-    down.raise_for_status()
+    part = destination_dir / f'{filename}.part'
+
+    file = File(url, filename, True, size, hashes or {})
 
-    # write bytes, baixa em chunks de 8192 mb
-    # o programa não inicia o próximo até a conclusão desse
-    with destination.open('wb') as dest:
-        for chunk in down.iter_content(chunk_size=8192):
-            dest.write(chunk)
+    # arquivos grandes são baixados em pedaços, se o servidor aceitar
+    # a pergunta é feita mesmo com um download em pedaços interrompido antes,
+    # já que quem responde pode ter mudado (a gravação com --record não aceita Range)
+    parallel = size is not None and size >= PARALLEL_THRESHOLD and _accepts_ranges(url)
 
-    return destination
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        # o que veio de uma tentativa anterior pode ser a causa de um hash errado
+        resumed = part.is_file() and part.stat().st_size > 0
+
+        try:
+            if parallel:
+                # os pedaços chegam fora de ordem, então o hash é calculado no final
+                _download_parallel(url, part, file)
+                digest = None
+            else:
+                digest = _download_part(url, part, file)
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError, requests.exceptions.Timeout) as e:
+            # o que já foi escrito no .part é mantido pra próxima tentativa
+            logger.debug(f'tentativa {attempt + 1}: {e}', title='download file')
+            continue
+        except IncompleteDownload:
+            continue
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
 
-def get_version_list(slug: str) -> list[Version]:
+            # erro do servidor costuma ser passageiro, o resto não muda tentando de novo
+            if status is not None and status >= 500:
+                logger.debug(f'tentativa {attempt + 1}: {status}', title='download file')
+                continue
+
+            logger.error(f'o servidor recusou o download ({status})', title=filename)
+            return
+
+        problem = check_file(part, file, digest)
+        if problem is not None:
+            part.unlink(missing_ok=True)
+            part.with_name(f'{part.name}.json').unlink(missing_ok=True)
+
+            # um .part antigo ou corrompido não condena o download, ele recomeça do zero
+            if resumed:
+                logger.debug(f'continuação corrompida ({problem}), recomeçando', title=filename)
+                continue
+
+            logger.error(f'download corrompido ({problem}), descartando', title=filename)
+            return
+
+        # o destino pode ser um hardlink pro armazenamento do cache
+        # o replace troca a entrada do diretório em vez de escrever por cima do arquivo guardado
+        part.replace(destination)
+        return destination
+
+    logger.error(f'download interrompido {DOWNLOAD_ATTEMPTS} vezes, ele continua na próxima execução', title=filename)
+
+def _version_list_params(game_versions: list[str] | None, loaders: list[str] | None) -> dict:
+    params = {'include_changelog': 'false'}
+    if game_versions:
+        params['game_versions'] = json.dumps(game_versions)
+    if loaders:
+        params['loaders'] = json.dumps(loaders)
+
+    return params
+
+def fetch_version_list(
+    project: Project,
+    cache_root: Path,
+    game_version: str,
+    loaders: list[str] | None,
+    cached: list[Version] | None = None,
+    validators: dict[str, str] | None = None
+    ) -> list[Version] | None:
     """
-    reestrutura os dados da api do modrinth pra serem uma lista de Version
-    mais informações sobre isso na função refine_version_list
+    obtém a lista de versões filtrada da api e atualiza o cache com ela
+    retorna None se a api não puder ser consultada
+
+    se já existir uma lista em cache com etag ou last-modified, a requisição é condicional
+    quando o projeto não mudou, a api responde 304 sem corpo nenhum,
+    e a lista em cache é reaproveitada sem baixar nem reprocessar nada
+
+    a lista e os validadores em cache não entram na chave do memo, então chamadas
+    com os mesmos filtros pro mesmo projeto fazem uma requisição só por execução,
+    inclusive quando acontecem ao mesmo tempo em threads diferentes
+
+    args:
+        cached:
+            lista de versões que já está em cache, retornada em caso de 304
+
+        validators:
+            validadores guardados junto dessa lista
     """
 
-    logger.debug(slug, title='get version list')
+    key = json.dumps([project.id, str(cache_root), game_version, loaders])
+    return _version_list_memo.call(
+        key, lambda: _fetch_version_list(project, cache_root, game_version, loaders, cached, validators)
+    )
+
+def _fetch_version_list(
+    project: Project,
+    cache_root: Path,
+    game_version: str,
+    loaders: list[str] | None,
+    cached: list[Version] | None,
+    validators: dict[str, str] | None
+    ) -> list[Version] | None:
+    logger.debug(project.slug, title='fetch version list')
+
+    headers = {}
+    if cached and validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    params = _version_list_params([game_version], loaders)
+    response = _send_project_request(project.slug, 'version', params, headers)
+    if response is None:
+        return
+
+    if response.status_code == 304:
+        logger.debug('lista de versões não modificada', title=project.slug)
+        return cached
+
+    version_list = refine_version_list(response.json(), project.id)
+
+    new_validators = {}
+    if response.headers.get('ETag'):
+        new_validators['etag'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        new_validators['last_modified'] = response.headers['Last-Modified']
+
+    write_version_list_cache(version_list, project, cache_root, game_version, loaders, new_validators)
 
-    data = _request_project_data(slug, section='version')
-    version_list = refine_version_list(data, slug)
-    
     return version_list
 
-def get_project(slug: str, treat_plugin_as_mod: bool = True) -> Project:
+def _revalidate_in_background(slugs: list[str], cache_root: Path):
+    """
+    busca de novo, numa thread separada, os dados de projetos cujo cache passou do ttl
+    quem pediu esses projetos já recebeu os dados antigos e não espera por essa busca
+
+    a thread não é daemon, então o programa espera ela terminar antes de fechar
+    """
+
+    with _revalidating_lock:
+        slugs = [ s for s in slugs if (cache_root, s) not in _revalidating ]
+        _revalidating.update((cache_root, s) for s in slugs)
+
+    if len(slugs) == 0:
+        return
+
+    def _revalidate():
+        try:
+            fetched, _ = _request_projects_data(slugs)
+            for data in fetched:
+                write_project_cache(data, cache_root)
+        finally:
+            with _revalidating_lock:
+                _revalidating.difference_update((cache_root, s) for s in slugs)
+
+    logger.debug(', '.join(slugs), title='revalidate projects')
+    threading.Thread(target=_revalidate, name='modtaur-revalidate').start()
+
+def _read_project_cache(
+    slugs: list[str],
+    cache_root: Path | None,
+    refresh: bool
+    ) -> tuple[dict[str, dict], list[str]]:
+    """
+    separa quais projetos podem ser respondidos pelo cache em disco e quais não
+
+    returns:
+        os dados encontrados por slug, e a lista de slugs que precisam ir pra api
+        dados vencidos são retornados mesmo assim, mas agendados pra revalidação
+    no modo offline, dados vencidos são usados sem revalidação
     """
+
+    # offline, o cache é tudo que existe, então o refresh não faz sentido
+    offline = session.is_offline()
+    if cache_root is None or (refresh and not offline):
+        return {}, slugs
+
+    found = {}
+    missing = []
+    stale = []
+    for s in slugs:
+        cached = get_cached_project_data(s, cache_root)
+        if cached is None:
+            missing.append(s)
+            continue
+
+        data, fresh = cached
+        found[s] = data
+        if not fresh:
+            stale.append(s)
+
+    if stale and not offline:
+        _revalidate_in_background(stale, cache_root)
+
+    return found, missing
+
+def get_projects(
+    slugs: list[str],
+    treat_plugin_as_mod: bool = True,
+    cache_root: Path | None = None,
+    refresh: bool = False,
+    not_found: set[str] | None = None
+    ) -> dict[str, Project]:
+    """
+    obtém os dados gerais de vários projetos, pela memória, pelo cache em disco
+    e, só pro que faltar, numa requisição em lote pra api
+
     args:
         treat_plugin_as_mod:
             pra casos tipo o do worldedit, que têm uma versão em plugin
@@ -167,11 +613,98 @@ def get_project(slug: str, treat_plugin_as_mod: bool = True) -> Project:
 
             se o projeto em questão tiver o tipo como 'plugin'
             ele vai convertido e tratado como 'mod'
+
+        cache_root:
+            se passado, os dados são lidos pelo cache em disco antes da api
+            mais informações em _read_project_cache
+
+        refresh:
+            ignora o cache em disco e sempre pede pra api
+
+        not_found:
+            se passado, recebe os slugs que a api confirmou não existirem
+            slugs que ficaram sem resposta por falha de rede não entram
+
+    returns:
+        dicionário com cada Project encontrado, acessível tanto pelo slug
+        quanto pelo id, além do identificador que foi originalmente passado
+        projetos que não existem não aparecem no dicionário
     """
 
-    logger.debug(slug, title='get project')
+    logger.debug(f'{len(slugs)} projetos', title='get projects')
+
+    # remove repetidos mantendo a ordem
+    slugs = list(dict.fromkeys(slugs))
+
+    def _key(s: str) -> str:
+        return json.dumps([s, treat_plugin_as_mod, str(cache_root), refresh])
+
+    # projetos já obtidos nessa execução não são pedidos de novo
+    projects = {}
+    missing = []
+    for s in slugs:
+        cached = _project_memo.get(_key(s))
+        if cached is None:
+            missing.append(s)
+            continue
+
+        projects[s] = cached
+
+    # depois da memória, o cache em disco, e só então a api
+    found, missing = _read_project_cache(missing, cache_root, refresh)
+    fetched = []
+    failed = []
+    if missing and not session.is_offline():
+        fetched, failed = _request_projects_data(missing)
+        if cache_root is not None:
+            for data in fetched:
+                write_project_cache(data, cache_root)
+
+    # a api encontra slugs sem diferenciar maiúsculas, então 'Sodium' volta como 'sodium'
+    # cada item recebido é ligado de volta aos identificadores que foram pedidos
+    by_id = { d.get('id'): d for d in fetched }
+    by_slug = { (d.get('slug') or '').lower(): d for d in fetched }
+
+    requested_for: dict[str, list[str]] = {}
+    for s in missing:
+        data = by_id.get(s) or by_slug.get(s.lower())
+        if data is not None:
+            requested_for.setdefault(data.get('id'), []).append(s)
+
+    entries = [ (data, [requested]) for requested, data in found.items() ]
+    entries += [ (data, requested_for.get(data.get('id'), [])) for data in fetched ]
+
+    for data, requested in entries:
+        project = _project_from_data(data, data.get('slug'), treat_plugin_as_mod)
+
+        for k in (project.id, project.slug, *requested):
+            projects[k] = project
+            _project_memo.put(_key(k), project)
+
+    for s in slugs:
+        if s not in projects:
+            if session.is_offline():
+                logger.error(f'modo offline, e o projeto não está no cache', title=s)
+            elif s not in failed:
+                logger.error(f'não foi possível obter os dados do projeto. isso provavelmente aconteceu por um slug inexistente', title=s)
+                if not_found is not None:
+                    not_found.add(s)
+
+    return projects
+
+def _project_from_data(data: dict, slug: str, treat_plugin_as_mod: bool = True) -> Project:
+    """
+    converte os dados gerais de um projeto vindos da api em um Project
+
+    args:
+        treat_plugin_as_mod:
+            pra casos tipo o do worldedit, que têm uma versão em plugin
+            mas também funcionam como mod normalmente
+
+            se o projeto em questão tiver o tipo como 'plugin'
+            ele vai convertido e tratado como 'mod'
+    """
 
-    data = _request_project_data(slug, section=None)
     project_type = data.get('project_type')
 
     if treat_plugin_as_mod and project_type == 'plugin':
@@ -185,136 +718,702 @@ def get_project(slug: str, treat_plugin_as_mod: bool = True) -> Project:
         loaders=data.get('loaders')
     )
 
-def resolve_dependencies(dependencies: list[Dependency], parent_slug: str, ctx: Context):
+def skip_known_unresolved(slugs: list[str], ctx: Context) -> list[str]:
     """
-    verifica quais dependências são obrigatórias pro funcionamento de um projeto e as baixa
+    tira da lista os projetos que falharam recentemente pra mesma versão e loader
+    eles vão direto pra ctx.unresolved, sem nenhuma requisição
+
+    returns:
+        os slugs que ainda precisam ser resolvidos
     """
 
-    logger.debug(parent_slug, title='resolve dependencies')
+    if ctx.retry_unresolved:
+        return slugs
 
-    if len(dependencies) == 0:
-        return
-
-    # baixar cada dependência
-    for d in dependencies:
-        if not d.dependency_type == 'required':
-            continue
-        
-        # não continuar caso essa dependência já tenha sido resolvida
-        # caso contrário, adiciona ela no set de resolvidas e prossegue
-        project_id = d.project_id
-        if project_id in ctx.resolved:
+    remaining = []
+    for s in slugs:
+        reason = get_negative_result(ctx.cache_root, s, ctx.version, ctx.loader)
+        if reason is None:
+            remaining.append(s)
             continue
 
-        ctx.resolved.add(project_id)
-        project = get_project(project_id)
+        logger.error(f'{reason} (resultado recente, use --retry-unresolved pra tentar de novo)', title=s)
+        ctx.unresolved.add(s)
 
-        resolve_project_downloading(project=project, ctx=ctx, is_dependency_for=parent_slug)
+    return remaining
 
-def resolve_project_downloading(
-    project: Project,
-    ctx: Context,
-    is_dependency_for: str | None = None
-    ):
+def remember_unresolved(slugs, ctx: Context, reason: str):
     """
-    args:
-        is_dependency_for:
-            se é uma dependência de algum outro projeto, deve ser espeficado
-            isso serve pro log ser mais detalhado        
+    guarda no cache negativo projetos que a api confirmou não poderem ser resolvidos
+    nada é guardado no modo offline, já que lá a falha é só do cache local
     """
 
-    def _install_predownloaded(target: Path, dependencies: list[Dependency]):
-        resolve_dependencies(dependencies, slug, ctx)
-        shutil.copy2(target, dir_destination)
-
-        logger.success(
-            'mod já baixado encontrado',
-            title=slug, details=dependency_label,
-            nerdfont_icon=nerdfont_icon
-        )
+    slugs = [ s for s in slugs if s ]
+    if len(slugs) == 0 or session.is_offline():
+        return
 
-    def _search_predownloaded():
-        return cache_root.rglob(f'*{suffix_type}')
+    write_negative_result(ctx.cache_root, slugs, ctx.version, ctx.loader, reason)
 
-    slug = project.slug
-    project_type = project.project_type
-    id = project.id
+def _project_directories(
+    project_type: str,
+    ctx: Context,
+    is_dependency: bool = False
+    ) -> tuple[Path, Path] | None:
+    """
+    returns:
+        tupla com o diretório de destino dentro da .minecraft
+        e o diretório de pré-baixados no cache
+        None se o tipo de projeto não for suportado
+    """
 
-    version = ctx.version
-    loader = ctx.loader
-    cache_root = ctx.cache_root
     dotminecraft = ctx.dotminecraft
 
-    logger.debug(slug, title='resolve project downloading')
-    
-    dir_destination = None
-    suffix_type = None
-
     if project_type == 'mod':
         dir_destination = dotminecraft.mods
-        suffix_type = '.jar'
     elif project_type == 'resourcepack':
         dir_destination = dotminecraft.resourcepacks
-        suffix_type = '.zip'
     else:
         logger.error(f'{project_type} não parece ser um tipo válido de projeto do modrinth')
         return
 
     # construção de caminhos de pré-baixados e cache
     # + s no final mod -> mods, resourcepack -> resourcepacks
-    dir_cached = cache_root / (project_type + 's') / version
-    if is_dependency_for is not None:
+    dir_cached = ctx.cache_root / (project_type + 's') / ctx.version
+    if is_dependency:
         dir_cached = dir_cached / 'dependencies'
     ensure_directory(dir_cached)
 
-    # definir argumentos pro log
-    nerdfont_icon = logger.DEFAULT_NERDFONT_ICON
-    dependency_label = None
-    if is_dependency_for is not None:
-        dependency_label = f'é uma dependência de {is_dependency_for}'
-        nerdfont_icon = '󰏖'
+    return dir_destination, dir_cached
+
+def _dependency_log_args(is_dependency_for: str | None) -> tuple[str | None, str]:
+    """
+    returns:
+        o texto de detalhe e o ícone usados nos logs de um projeto
+    """
+
+    if is_dependency_for is None:
+        return None, logger.DEFAULT_NERDFONT_ICON
+
+    return f'é uma dependência de {is_dependency_for}', '󰏖'
+
+def find_predownloaded(file: File, ctx: Context) -> Path | None:
+    """
+    procura um arquivo já baixado antes, primeiro no armazenamento por hash
+    e depois, pra arquivos sem hash ou baixados antes dele existir, pelo índice de nomes
+
+    o nome sozinho não garante que é o mesmo arquivo, então um arquivo encontrado
+    pelo índice é conferido com o tamanho e o hash da api antes de ser usado.
+    se ele estiver certo e tiver sha512, vai pro armazenamento por hash,
+    e nas próximas vezes é encontrado sem precisar ser lido de novo
+
+    returns:
+        o caminho do arquivo, ou None se ele não foi encontrado ou não confere
+    """
+
+    blob = get_blob(ctx.cache_root, file)
+    if blob:
+        # o nome do blob é o sha512 conferido no download, mas ele é o mesmo arquivo
+        # que foi instalado na .minecraft. se ele foi modificado por lá, o hash é conferido de novo
+        problem = None
+        if file.size is not None and blob.stat().st_size != file.size:
+            problem = 'tamanho diferente'
+        elif not is_blob_sealed(blob):
+            problem = check_file(blob, file)
+            if problem is None:
+                seal_blob(blob)
+
+        if problem is None:
+            return blob
+
+        logger.warning(f'arquivo do cache modificado ({problem}), baixando de novo', title=file.filename)
+        blob.unlink(missing_ok=True)
+        return
+
+    cached = find_cached_file(ctx.cache_root, file.filename)
+    if cached is None:
+        return
+
+    problem = check_file(cached, file)
+    if problem is not None:
+        logger.warning(f'arquivo do cache não confere ({problem}), baixando de novo', title=file.filename)
+        forget_cached_file(ctx.cache_root, file.filename)
+        return
+
+    return add_blob(ctx.cache_root, cached, file) or cached
+
+def fetch_into_cache(resolved: ResolvedProject, ctx: Context) -> Path | None:
+    """
+    baixa o arquivo de um projeto pro cache, sem tocar na .minecraft
+
+    arquivos com hash vão pro armazenamento por conteúdo
+    os sem hash continuam indo pro diretório de já baixados
+
+    returns:
+        o caminho do arquivo no cache, ou None se o download falhou
+    """
+
+    file = resolved.file
+
+    if session.is_offline():
+        logger.error('modo offline, e o arquivo não está no cache', title=resolved.slug, details=file.filename)
+        return
+
+    directories = _project_directories(resolved.project_type, ctx, resolved.is_dependency_for is not None)
+    if directories is None:
+        return
+    _, dir_cached = directories
+
+    dependency_label, _ = _dependency_log_args(resolved.is_dependency_for)
+
+    # cada versão baixa num diretório próprio, já que dois projetos diferentes
+    # podem ter arquivos com o mesmo nome. o caminho não muda entre execuções,
+    # então um download interrompido é continuado na próxima
+    dir_downloading = ctx.cache_root / 'downloading' / resolved.version_id
+    ensure_directory(dir_downloading)
+
+    # baixar o arquivo triggando um spinner pro carregamento do download
+    with logger.spinner(title=resolved.slug, details=dependency_label):
+        downloaded = download_file(file.url, file.filename, dir_downloading, file.size, file.hashes)
+
+    if downloaded is None:
+        return
+
+    blob = add_blob(ctx.cache_root, downloaded, file)
+    if blob is not None:
+        downloaded.unlink()
+        cached = blob
+    else:
+        cached = dir_cached / file.filename
+        downloaded.replace(cached)
+        register_cached_file(ctx.cache_root, file.filename, cached)
+
+    # o diretório só precisa continuar existindo enquanto tiver um .part dentro
+    try:
+        dir_downloading.rmdir()
+    except OSError:
+        pass
+
+    return cached
+
+def _choose_version(project: Project, ctx: Context, prefer_cache: bool) -> tuple[Version, File] | None:
+    """
+    escolhe a versão compatível de um projeto e o arquivo primário dela
+
+    args:
+        prefer_cache:
+            se a lista de versões em cache já tiver uma versão compatível
+            cujo arquivo também já foi baixado, ela é usada sem consultar a api
+            caso contrário, a lista é revalidada com a api (um 304 quando nada mudou)
+    """
+
+    # o loader só é filtrado pra mods, igual em get_compatible_version
+    loaders = [ctx.loader] if project.project_type == 'mod' else None
 
     # tentar obter o projeto pelo cache e pelo diretório de pré-baixados
     # antes de tentar fazer uma requisição pra api e baixar pela web
-    version_list = get_cached_version_list(id, cache_root)
-    if version_list:
+    cached, validators = get_cached_version_list_entry(project.id, ctx.cache_root, ctx.version, loaders)
+    if prefer_cache and cached:
+        compatible = get_compatible_version(cached, project, ctx)
+        primary = get_primary_file(compatible, ctx) if compatible else None
+        if primary and find_predownloaded(primary, ctx):
+            return compatible, primary
+
+    # offline, a lista em cache é usada mesmo sem o arquivo já baixado
+    # o plano mostra esse arquivo como faltando antes de qualquer coisa ser instalada
+    if session.is_offline():
+        version_list = cached or []
         compatible = get_compatible_version(version_list, project, ctx)
-        if compatible:
-            url, filename = get_primary_jar(compatible, ctx)
+        primary = get_primary_file(compatible, ctx) if compatible else None
+        if primary is None:
+            return
 
-            for f in _search_predownloaded():
-                if f.name == filename:
-                    dependencies = compatible.dependencies
-                    _install_predownloaded(f, dependencies)
-                    return
+        return compatible, primary
 
     # se não tiver obtido os dados pelo cache, requisita pra api
-    # também escreve a versão atualizada da lista de versions do projeto
-    version_list = get_version_list(slug)
-    write_version_list_cache(version_list, cache_root / 'version-lists' / f'{slug}.json')
-    
+    # se a lista em cache ainda estiver atualizada, a api só confirma isso com um 304
+    # caso contrário, também escreve a versão atualizada da lista de versions do projeto
+    version_list = fetch_version_list(project, ctx.cache_root, ctx.version, loaders, cached, validators)
+    if version_list is None:
+        return
+
     compatible = get_compatible_version(version_list, project, ctx)
     if not compatible:
+        # a api respondeu, então não ter versão compatível é um resultado de verdade
+        remember_unresolved([project.slug, project.id], ctx, 'nenhuma versão compatível')
         return
 
-    dependencies = compatible.dependencies
-    url, filename = get_primary_jar(compatible, ctx)
+    primary = get_primary_file(compatible, ctx)
+    if primary is None:
+        return
+
+    return compatible, primary
+
+def find_compatible_version(project: Project, ctx: Context, refresh: bool = False) -> tuple[Version | None, bool]:
+    """
+    procura uma versão do projeto que seja compatível, ao mesmo tempo, com a versão do jogo e o loader
+    os dados gerais do projeto juntam o que todas as versões suportam, então
+    não servem pra isso: fabric pode existir só numa versão e 1.20.1 só em outra
+
+    diferente de _choose_version, o arquivo não importa, então uma versão compatível
+    na lista em cache é aceita sem consultar a api. só quando a lista em cache
+    não tem nenhuma é que ela é revalidada, já que ela pode estar desatualizada
+
+    args:
+        refresh:
+            ignora a lista em cache e sempre pede pra api
+
+    returns:
+        a versão compatível ou None, e se essa resposta é definitiva
+        não é definitiva quando a api não pôde ser consultada,
+        ou no modo offline sem a lista no cache
+    """
+
+    # se nem a união das versões suporta, nenhuma versão sozinha vai suportar
+    is_mod = project.project_type == 'mod'
+    if ctx.version not in project.game_versions or (is_mod and ctx.loader not in project.loaders):
+        return None, True
+
+    # o loader só é filtrado pra mods, igual em get_compatible_version
+    loaders = [ctx.loader] if is_mod else None
+    loader = ctx.loader if is_mod else None
+
+    cached, validators = get_cached_version_list_entry(project.id, ctx.cache_root, ctx.version, loaders)
+    if cached and not refresh:
+        candidates = cached.candidates(ctx.version, loader)
+        if candidates:
+            return candidates[0], True
+
+    if session.is_offline():
+        candidates = cached.candidates(ctx.version, loader) if cached else []
+        return (candidates[0] if candidates else None), bool(cached)
+
+    if refresh:
+        cached, validators = None, None
+
+    version_list = fetch_version_list(project, ctx.cache_root, ctx.version, loaders, cached, validators)
+    if version_list is None:
+        return None, False
+
+    candidates = version_list.candidates(ctx.version, loader)
+    if not candidates:
+        remember_unresolved([project.slug, project.id], ctx, 'nenhuma versão compatível')
+        return None, True
+
+    return candidates[0], True
+
+def find_compatible_versions(
+    projects: list[Project],
+    ctx: Context,
+    refresh: bool = False
+    ) -> list[tuple[Version | None, bool] | None]:
+    """
+    versão em lote de find_compatible_version, usando até ctx.jobs threads
+    com o cache quente, quase nada vai pra api, e o que vai é pedido ao mesmo tempo
+
+    returns:
+        os resultados na mesma ordem dos projetos, com None nos que falharam
+    """
+
+    logger.debug(f'{len(projects)} projetos, {ctx.jobs} threads', title='find compatible versions')
+
+    return _run_in_pool(
+        projects, ctx,
+        lambda p: find_compatible_version(p, ctx, refresh),
+        title=lambda p: p.slug
+    )
+
+def _resolve_node(
+    project: Project,
+    ctx: Context,
+    is_dependency_for: str | None,
+    on_resolved,
+    prefer_cache: bool
+    ) -> tuple[ResolvedProject, Version] | None:
+    """
+    escolhe a versão e o arquivo de um único projeto, sem olhar as dependências dele
+
+    args:
+        on_resolved:
+            função chamada com o ResolvedProject no momento em que a versão dele
+            é escolhida, antes mesmo das dependências dele serem resolvidas
+            é assim que o download de um projeto começa enquanto o resto ainda é resolvido
+
+        prefer_cache:
+            mais informações em _choose_version
+            o lockfile não usa isso, já que o resultado vai ficar fixado nele
+
+    returns:
+        o projeto resolvido e a versão escolhida, ou None se não houver versão compatível
+    """
+
+    slug = project.slug
+    project_type = project.project_type
+
+    if project_type not in ('mod', 'resourcepack'):
+        logger.error(f'{project_type} não parece ser um tipo válido de projeto do modrinth')
+        ctx.unresolved.add(slug)
+        return
+
+    chosen = _choose_version(project, ctx, prefer_cache)
+    if chosen is None:
+        ctx.unresolved.add(slug)
+        return
+    compatible, primary = chosen
+
+    # com o cache negativo ignorado, um projeto que voltou a funcionar sai dele
+    if ctx.retry_unresolved:
+        clear_negative_result(ctx.cache_root, [slug, project.id], ctx.version, ctx.loader)
+
+    resolved = _resolved_from_version(slug, project_type, compatible, primary, is_dependency_for)
+
+    if on_resolved is not None:
+        on_resolved(resolved)
+
+    return resolved, compatible
+
+def _resolved_from_version(
+    slug: str,
+    project_type: str,
+    version: Version,
+    primary: File,
+    is_dependency_for: str | None
+    ) -> ResolvedProject:
+    # dependências fixadas sem project_id só ganham o id depois que a versão delas é obtida
+    required = [ d.project_id for d in version.dependencies if d.dependency_type == 'required' and d.project_id ]
+
+    return ResolvedProject(
+        slug=slug,
+        project_id=version.project_id,
+        project_type=project_type,
+        version_id=version.id,
+        file=primary,
+        dependencies=required,
+        is_dependency_for=is_dependency_for
+    )
+
+def _resolve_pinned(
+    pinned: list[tuple[Dependency, ResolvedProject]],
+    graph: DependencyGraph,
+    ctx: Context,
+    on_resolved
+    ) -> tuple[list[tuple[ResolvedProject, Version]], list[tuple[str, ResolvedProject]]]:
+    """
+    resolve dependências que já dizem a versão exata que precisam
+
+    todas as versões são obtidas numa requisição em lote, e nenhum projeto
+    é consultado nem tem a lista de versões percorrida. como a api não manda o slug
+    junto da versão, ele vem do cache de projetos quando existir, ou fica o id
+
+    returns:
+        os projetos resolvidos com as versões deles, e as dependências que não puderam
+        ser obtidas assim, ou cuja versão fixada não suporta a versão do jogo e o loader,
+        como (id do projeto, quem pediu) pra seguirem o caminho normal
+        as que não puderam ser obtidas e não têm project_id não têm caminho normal,
+        e vão pra ctx.unresolved
+    """
+
+    versions = get_versions([ d.version_id for d, _ in pinned ], ctx.cache_root)
+
+    resolved = []
+    fallback = []
+    for dependency, parent in pinned:
+        version = versions.get(dependency.version_id)
+        if version is None:
+            if dependency.project_id:
+                fallback.append((dependency.project_id, parent))
+                continue
+
+            # sem project_id não existe outro caminho, e a dependência continua obrigatória
+            logger.error(f'não foi possível obter a versão fixada {dependency.version_id}', title=parent.slug)
+            ctx.unresolved.add(f'{dependency.version_id} (dependência de {parent.slug})')
+            continue
+
+        # uma versão fixada pra outra versão do jogo ou outro loader não serve,
+        # então o projeto dela tem uma versão compatível escolhida pelo caminho normal
+        if not _version_supports_context(version, parent.project_type, ctx):
+            logger.debug(f'versão fixada {version.id} incompatível, escolhendo outra', title=parent.slug)
+            fallback.append((dependency.project_id or version.project_id, parent))
+            continue
+
+        graph.add_edge(parent.project_id, version.project_id)
+        if not ctx.claim(version.project_id):
+            continue
+
+        primary = get_primary_file(version, ctx)
+        if primary is None:
+            ctx.unresolved.add(version.project_id)
+            continue
+
+        cached = get_cached_project_data(version.project_id, ctx.cache_root)
+        slug = cached[0].get('slug', version.project_id) if cached else version.project_id
+
+        logger.debug(f'versão fixada {version.id}', title=slug)
+
+        # dependências de um projeto são do mesmo tipo dele
+        r = _resolved_from_version(slug, parent.project_type, version, primary, parent.slug)
+        if on_resolved is not None:
+            on_resolved(r)
 
-    # depois de obter os dados, resolve as dependências, baixando as necessárias
-    resolve_dependencies(dependencies, slug, ctx)
+        resolved.append((r, version))
 
-    # tentar só encontrar mods pré-baixados de novo
-    # se isso não for feito novamente, mesmo que o mod já esteja pré-baixado
-    # o download dele seria feito de novo (se esse mod já não estiver no cache)
-    for f in _search_predownloaded():
-        if f.name == filename:
-            _install_predownloaded(f, dependencies)
+    return resolved, fallback
+
+def install_resolved(resolved: ResolvedProject, ctx: Context):
+    """
+    instala um projeto já resolvido, sem nenhuma chamada pra api
+    o arquivo vem do cache se já tiver sido baixado, ou é baixado pra ele antes
+    """
+
+    slug = resolved.slug
+
+    logger.debug(slug, title='install resolved')
+
+    directories = _project_directories(resolved.project_type, ctx, resolved.is_dependency_for is not None)
+    if directories is None:
+        return
+    dir_destination, _ = directories
+
+    dependency_label, nerdfont_icon = _dependency_log_args(resolved.is_dependency_for)
+
+    cached = find_predownloaded(resolved.file, ctx)
+    if cached:
+        logger.success(
+            'mod já baixado encontrado',
+            title=slug, details=dependency_label,
+            nerdfont_icon=nerdfont_icon
+        )
+    else:
+        cached = fetch_into_cache(resolved, ctx)
+        if cached is None:
             return
 
-    # baixar o arquivo triggando um spinner pro carregamento do download
-    with logger.spinner(title=slug, details=dependency_label):
-        dest = download_file(url, filename, dir_destination)
+    install_file(cached, dir_destination, resolved.file.filename)
+
+def _run_in_pool(items: list, ctx: Context, function, title) -> list:
+    """
+    executa function pra cada item usando até ctx.jobs threads
+
+    um item que falha não interrompe os outros, só é logado
     
-    # copiar pro diretório de já baixados pra não precisar baixar de novo
-    copy_dest = dir_cached / filename
-    shutil.copy2(dest, copy_dest)
\ No newline at end of file
+    args:
+        title:
+            função que recebe um item e retorna o título usado no log de erro
+
+    returns:
+        os resultados na mesma ordem dos itens, com None nos que falharam
+    """
+
+    results = [None] * len(items)
+
+    with ThreadPoolExecutor(max_workers=max(1, ctx.jobs)) as pool:
+        futures = { pool.submit(function, item): i for i, item in enumerate(items) }
+
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.error(f'falha ao resolver o projeto: {e}', title=title(items[i]))
+
+    return results
+
+def _supports_context(data: dict, ctx: Context) -> bool:
+    """
+    se os dados gerais de um projeto, como vêm da api, dizem suportar a versão e o loader
+    """
+
+    if ctx.version not in (data.get('game_versions') or []):
+        return False
+
+    if data.get('project_type') == 'mod' and ctx.loader not in (data.get('loaders') or []):
+        return False
+
+    return True
+
+def _version_supports_context(version: Version, project_type: str, ctx: Context) -> bool:
+    """
+    se uma versão específica suporta a versão do jogo e, pra mods, o loader do contexto
+    """
+
+    if ctx.version not in version.game_versions:
+        return False
+
+    if project_type == 'mod' and ctx.loader not in version.loaders:
+        return False
+
+    return True
+
+def seed_dependencies(level: list[tuple[ResolvedProject, Version]], ctx: Context):
+    """
+    obtém de uma vez os dados das dependências obrigatórias de um projeto do nível
+    pelo endpoint /project/{id}/dependencies, que manda os projetos e as versões fixadas juntos
+
+    o endpoint é por projeto, e o próximo nível de resolve_graph pede tudo em lote:
+    um /projects e, se houver versões fixadas, um /versions. então ele só é usado
+    quando um único projeto do nível tem dependências fora do cache e alguma delas
+    é fixada, trocando essas duas requisições por uma
+
+    os dados vão pros caches de projetos e de versões sem filtro nenhum,
+    já que eles não dependem do contexto. a compatibilidade é decidida depois,
+    na escolha das versões e em _resolve_pinned
+    """
+
+    if session.is_offline() or ctx.refresh:
+        return
+
+    missing = []
+    for resolved, version in level:
+        required = [ d for d in version.dependencies if d.dependency_type == 'required' ]
+
+        unknown_projects = [
+            d.project_id for d in required
+            if d.project_id and get_cached_project_data(d.project_id, ctx.cache_root) is None
+        ]
+        unknown_versions = [
+            d.version_id for d in required
+            if d.version_id and get_cached_version(d.version_id, ctx.cache_root) is None
+        ]
+        if unknown_projects or unknown_versions:
+            missing.append((resolved, unknown_versions))
+
+    if len(missing) != 1 or not missing[0][1]:
+        return
+    resolved, _ = missing[0]
+
+    logger.debug('dependências de um projeto só', title=f'seed {resolved.slug}')
+
+    response = _send_project_request(resolved.project_id, 'dependencies')
+    if response is None:
+        return
+    data = response.json()
+
+    for v in refine_version_list(data.get('versions') or [], None):
+        write_version_cache(v, ctx.cache_root)
+
+    for p in data.get('projects') or []:
+        write_project_cache(p, ctx.cache_root)
+
+def resolve_graph(
+    slugs: list[str],
+    ctx: Context,
+    on_resolved=None,
+    prefer_cache: bool = False
+    ) -> DependencyGraph:
+    """
+    resolve vários projetos e todas as dependências deles, um nível do grafo por vez
+
+    cada nível custa uma requisição em lote pros dados dos projetos,
+    e as versões de todos os projetos do nível são escolhidas ao mesmo tempo
+    assim uma cadeia tipo supplementaries -> moonlight -> fabric-api custa
+    uma ida à api por nível, não uma por projeto
+
+    os argumentos on_resolved e prefer_cache funcionam igual aos de _resolve_node
+    o ctx.resolved é compartilhado, então um projeto que aparece em mais de um lugar
+    só é resolvido uma vez, mas todas as arestas até ele ficam no grafo
+    projetos que não puderam ser resolvidos são adicionados em ctx.unresolved
+    """
+
+    logger.debug(f'{len(slugs)} projetos, {ctx.jobs} threads', title='resolve graph')
+
+    graph = DependencyGraph()
+
+    # (slug ou id, projeto que pediu ele como dependência)
+    frontier: list[tuple[str, ResolvedProject | None]] = [ (s, None) for s in dict.fromkeys(slugs) ]
+    pinned_level: list[tuple[ResolvedProject, Version]] = []
+    depth = 0
+
+    while frontier or pinned_level:
+        logger.debug(f'nível {depth}: {len(frontier)} projetos', title='resolve graph')
+
+        keys = skip_known_unresolved(list(dict.fromkeys(k for k, _ in frontier)), ctx)
+
+        # os dados de todos os projetos do nível são obtidos de uma vez
+        projects = {}
+        if keys:
+            not_found = set()
+            projects = get_projects(keys, cache_root=ctx.cache_root, refresh=ctx.refresh, not_found=not_found)
+            remember_unresolved(not_found, ctx, 'slug inexistente')
+
+        pending: list[tuple[Project, ResolvedProject | None]] = []
+        for key, parent in frontier:
+            project = projects.get(key)
+            if project is None:
+                ctx.unresolved.add(key)
+                continue
+
+            if parent is None:
+                graph.roots.append(project.id)
+            else:
+                graph.add_edge(parent.project_id, project.id)
+
+            # o id é marcado como resolvido pra que o mesmo projeto
+            # não seja resolvido de novo caso ele também seja dependência de outro
+            if not ctx.claim(project.id):
+                logger.debug('já resolvido por outro projeto', title=project.slug)
+                continue
+
+            pending.append((project, parent))
+
+        def _resolve(item: tuple[Project, ResolvedProject | None]) -> tuple[ResolvedProject, Version] | None:
+            project, parent = item
+            return _resolve_node(project, ctx, parent.slug if parent else None, on_resolved, prefer_cache)
+
+        # as versões do nível inteiro são escolhidas ao mesmo tempo
+        level = [ r for r in _run_in_pool(pending, ctx, _resolve, title=lambda item: item[0].slug) if r is not None ]
+        level.extend(pinned_level)
+
+        for resolved, _ in level:
+            graph.nodes[resolved.project_id] = resolved
+
+        seed_dependencies(level, ctx)
+
+        frontier = []
+        pinned = []
+        for resolved, version in level:
+            for d in version.dependencies:
+                if d.dependency_type != 'required':
+                    continue
+
+                # dependências já resolvidas só ganham a aresta, sem voltar pra fila
+                if d.project_id in graph.nodes:
+                    graph.add_edge(resolved.project_id, d.project_id)
+                elif d.version_id:
+                    pinned.append((d, resolved))
+                elif d.project_id:
+                    frontier.append((d.project_id, resolved))
+
+        # dependências com versão fixada pulam a consulta do projeto e a escolha da versão
+        # elas entram direto no próximo nível, já resolvidas
+        pinned_level = []
+        if pinned:
+            pinned_level, fallback = _resolve_pinned(pinned, graph, ctx, on_resolved)
+            frontier.extend(fallback)
+
+        depth += 1
+
+    return graph
+
+def resolve_closure(
+    slugs: list[str],
+    ctx: Context,
+    on_resolved=None,
+    prefer_cache: bool = False
+    ) -> list[ResolvedProject]:
+    """
+    resolve vários projetos e todas as dependências deles, sem instalar nada
+    mais informações em resolve_graph
+
+    returns:
+        todos os projetos e dependências, com as dependências sempre antes de quem depende delas
+    """
+
+    return resolve_graph(slugs, ctx, on_resolved, prefer_cache).install_order()
+
+def install_resolved_projects(resolved: list[ResolvedProject], ctx: Context):
+    """
+    instala projetos já resolvidos (normalmente vindos do lockfile) em paralelo
+    """
+
+    logger.debug(f'{len(resolved)} projetos, {ctx.jobs} threads', title='install resolved projects')
+
+    _run_in_pool(resolved, ctx, lambda r: install_resolved(r, ctx), title=lambda r: r.slug)
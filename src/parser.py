@@ -1,4 +1,4 @@
-from .utils import Context, Project, Version, Dependency, File
+from .utils import Context, Project, Version, VersionList, Dependency, File
 from . import logger
 
 def get_compatible_version(
@@ -12,12 +12,25 @@ def get_compatible_version(
     o alvo vai ser definido como a primeira versão que:
         contenha uma versão compatível com a passada pra função
         e contenha um loader compatível com o passado pra função
+
+    se version_list for uma VersionList, o alvo sai direto do índice dela
     """
     
     modpack_game_version = ctx.version
     project_type = project.project_type
     slug = project.slug
 
+    # só precisa verificar compatibilidade com o loader se for um mod
+    if isinstance(version_list, VersionList):
+        loader = ctx.loader if project_type == 'mod' else None
+        candidates = version_list.candidates(modpack_game_version, loader, release_only)
+
+        if len(candidates) == 0:
+            logger.error('alvo não encontrado, possivelmente por não ser compatível com o loader ou versão', title=slug)
+            return
+
+        return candidates[0]
+
     target = None
     for v in version_list:
         game_versions = v.game_versions
@@ -46,13 +59,13 @@ def get_compatible_version(
 
     return target
 
-def get_primary_jar(version: Version, ctx: Context):
+def get_primary_file(version: Version, ctx: Context) -> File | None:
     """
     obtém o arquivo primário que um mod precisa pra funcionar
     junto de um mod, podem vir arquivos extras, como código fonte, licenças etc.
-    
-    essa função garante que a única url de download obtida
-    seja desse arquivo .jar primário
+
+    essa função garante que o único arquivo obtido seja esse .jar primário,
+    com a url, o nome, o tamanho e os hashes dele
     """
 
     slug = version.project_id
@@ -71,7 +84,7 @@ def get_primary_jar(version: Version, ctx: Context):
         primary = f
         break
 
-    if primary is None:
+    if primary is None and len(files) > 0:
         logger.warning('primário não encontrado, usando o primeiro item da lista como fallback', title=slug)
         primary = files[0]
     
@@ -79,14 +92,14 @@ def get_primary_jar(version: Version, ctx: Context):
         logger.error('o projeto não possui nenhum arquivo disponível', title=slug)
         return
 
-    url = primary.url
-    filename = primary.filename
+    return primary
 
-    # retorna esses dois valores como tupla
-    # devem ser desempacotados respectivamente ao usar a função
-    return url, filename
-
-def refine_version_list(data: list[dict], project_id: str) -> list[Version]:
+def refine_version_list(
+    data: list[dict],
+    project_id: str,
+    index: dict[str, list[int]] | None = None,
+    release_index: dict[str, list[int]] | None = None
+    ) -> VersionList:
     """
     reorganiza os dados de versões de um projeto vindos da api do modrinth
 
@@ -99,9 +112,14 @@ def refine_version_list(data: list[dict], project_id: str) -> list[Version]:
         
         project_id:
             id do projeto pai, usado para associar cada versão a ele
+            só é usado se a própria versão não disser a qual projeto pertence
+
+        index, release_index:
+            índices já montados antes, normalmente guardados no cache junto da lista
+            se omitidos, são montados a partir das versões
 
     returns:
-        lista de objetos Version com os arquivos e dependências estruturados
+        VersionList com os arquivos e dependências estruturados
     """
 
     version_list = []
@@ -113,7 +131,9 @@ def refine_version_list(data: list[dict], project_id: str) -> list[Version]:
                 File(
                     url=f.get('url'),
                     filename=f.get('filename'),
-                    primary=f.get('primary')
+                    primary=f.get('primary'),
+                    size=f.get('size'),
+                    hashes=f.get('hashes') or {}
                 )
             )
 
@@ -122,13 +142,14 @@ def refine_version_list(data: list[dict], project_id: str) -> list[Version]:
             dependencies.append(
                 Dependency(
                     project_id=d.get('project_id'),
-                    dependency_type=d.get('dependency_type')
+                    dependency_type=d.get('dependency_type'),
+                    version_id=d.get('version_id')
                 )
             )
 
         version_list.append(
             Version(
-                project_id=project_id,
+                project_id=ver.get('project_id') or project_id,
                 id=ver.get('id'),
                 game_versions=ver.get('game_versions'),
                 loaders=ver.get('loaders'),
@@ -138,4 +159,4 @@ def refine_version_list(data: list[dict], project_id: str) -> list[Version]:
             )
         )
 
-    return version_list
\ No newline at end of file
+    return VersionList(version_list, index, release_index)
\ No newline at end of file
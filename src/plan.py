@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from .utils import Context, InstallPlan, ResolvedProject
+from .modrinth import resolve_closure, find_predownloaded, fetch_into_cache
+from . import logger, session
+
+def _classify(plan: InstallPlan, resolved: ResolvedProject, ctx: Context) -> bool:
+    """
+    coloca um projeto resolvido em plan.cached ou plan.to_download
+
+    returns:
+        true se o arquivo dele já estiver no cache
+    """
+
+    cached = find_predownloaded(resolved.file, ctx) is not None
+
+    if cached:
+        plan.cached.append(resolved)
+    elif session.is_offline():
+        plan.unavailable.append(resolved)
+    else:
+        plan.to_download.append(resolved)
+
+    return cached
+
+def build_plan(slugs: list[str], ctx: Context, prefetch: bool = False) -> InstallPlan:
+    """
+    resolve o modpack inteiro e monta o plano de instalação, sem tocar na .minecraft
+
+    args:
+        prefetch:
+            começa a baixar pro cache os arquivos que faltam enquanto o resto
+            ainda está sendo resolvido. mesmo assim nada é instalado,
+            então o load ainda pode desistir depois de ver o plano
+    """
+
+    logger.debug(f'{len(slugs)} projetos', title='build plan')
+
+    plan = InstallPlan()
+    plan_lock = threading.Lock()
+    downloads = []
+
+    with ThreadPoolExecutor(max_workers=max(1, ctx.jobs)) as download_pool:
+        def _on_resolved(resolved: ResolvedProject):
+            with plan_lock:
+                cached = _classify(plan, resolved, ctx)
+
+            if prefetch and not cached and not session.is_offline():
+                downloads.append((download_pool.submit(fetch_into_cache, resolved, ctx), resolved.slug))
+
+        plan.resolved = resolve_closure(slugs, ctx, on_resolved=_on_resolved, prefer_cache=True)
+
+    # o with acima só termina depois que a fila de downloads esvaziar
+    _wait_downloads(downloads)
+    if prefetch:
+        _check_prefetched(plan, ctx)
+
+    plan.unresolved = sorted(ctx.unresolved)
+
+    return plan
+
+def _wait_downloads(downloads: list):
+    for future, slug in downloads:
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(f'falha ao baixar o projeto: {e}', title=slug)
+
+def _check_prefetched(plan: InstallPlan, ctx: Context):
+    """
+    confere no cache cada arquivo que o prefetch devia ter baixado
+    os que continuam faltando vão pra plan.failed, e o load desiste antes de
+    apagar qualquer coisa, em vez de descobrir a falha no meio da instalação
+    """
+
+    if session.is_offline():
+        return
+
+    plan.failed = [ r for r in plan.to_download if find_predownloaded(r.file, ctx) is None ]
+
+def plan_from_resolved(resolved: list[ResolvedProject], ctx: Context, prefetch: bool = False) -> InstallPlan:
+    """
+    monta o plano de projetos que já foram resolvidos, normalmente vindos do lockfile
+
+    args:
+        prefetch:
+            baixa pro cache os arquivos que faltam, como em build_plan
+    """
+
+    plan = InstallPlan(resolved=resolved)
+    for r in resolved:
+        _classify(plan, r, ctx)
+
+    if not prefetch or session.is_offline():
+        return plan
+
+    with ThreadPoolExecutor(max_workers=max(1, ctx.jobs)) as download_pool:
+        downloads = [ (download_pool.submit(fetch_into_cache, r, ctx), r.slug) for r in plan.to_download ]
+
+    _wait_downloads(downloads)
+    _check_prefetched(plan, ctx)
+
+    return plan
+
+def _format_bytes(size: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+
+    return f'{size:.1f} GB'
+
+def log_plan(plan: InstallPlan, title: str):
+    logger.info(
+        f'{len(plan.resolved)} projetos: {len(plan.cached)} já no cache, '
+        f'{len(plan.to_download)} pra baixar ({_format_bytes(plan.download_bytes)})',
+        title=title
+    )
+
+    for u in plan.unresolved:
+        logger.error('não resolvido', title=u)
+
+    for r in plan.unavailable:
+        logger.error('modo offline, e o arquivo não está no cache', title=r.slug, details=r.file.filename)
+
+    for r in plan.failed:
+        logger.error('o arquivo não pôde ser baixado', title=r.slug, details=r.file.filename)
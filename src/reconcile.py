@@ -0,0 +1,84 @@
+from pathlib import Path
+
+from .utils import Context, File, ResolvedProject, ReconcilePlan
+from .store import file_digest
+from . import logger
+
+def _matches(installed: Path, expected: File) -> bool:
+    """
+    verifica se um arquivo já instalado é o mesmo que o esperado
+    o tamanho é suficiente na maioria dos casos, e é bem mais barato que o hash
+    o hash só é calculado se a api não tiver informado o tamanho
+    """
+
+    if expected.size is not None:
+        return installed.stat().st_size == expected.size
+
+    sha1 = expected.hashes.get('sha1')
+    if sha1:
+        return file_digest(installed, 'sha1') == sha1
+
+    # sem tamanho e sem hash, só o nome pode ser comparado
+    return True
+
+def plan_reconcile(resolved: list[ResolvedProject], types: list[str], ctx: Context) -> ReconcilePlan:
+    """
+    compara os arquivos que o modpack precisa com os que já estão na .minecraft
+
+    args:
+        types:
+            tipos de projeto sendo aplicados ('mod', 'resourcepack')
+            só os diretórios desses tipos são considerados,
+            então aplicar só mods nunca remove resourcepacks
+
+    returns:
+        o que precisa ser instalado, o que já está certo e o que deve ser removido
+    """
+
+    directories = {
+        'mod': ctx.dotminecraft.mods,
+        'resourcepack': ctx.dotminecraft.resourcepacks
+    }
+
+    plan = ReconcilePlan()
+    expected: set[Path] = set()
+
+    for r in resolved:
+        directory = directories.get(r.project_type)
+        if directory is None:
+            continue
+
+        target = directory / r.file.filename
+
+        if target.is_file() and _matches(target, r.file):
+            expected.add(target)
+            plan.keep.append(r)
+        else:
+            plan.add.append(r)
+
+    # tudo que está nos diretórios gerenciados mas não faz parte do modpack
+    # também inclui arquivos com o nome certo mas conteúdo diferente, já que eles vão ser substituídos
+    for project_type in types:
+        directory = directories.get(project_type)
+        if directory is None or not directory.is_dir():
+            continue
+
+        for f in directory.iterdir():
+            if not f.is_file():
+                continue
+
+            if f not in expected:
+                plan.remove.append(f)
+
+    return plan
+
+def log_plan(plan: ReconcilePlan, title: str):
+    logger.info(
+        f'{len(plan.add)} pra adicionar, {len(plan.remove)} pra remover, {len(plan.keep)} mantidos',
+        title=title
+    )
+
+def remove_stale(plan: ReconcilePlan):
+    for f in plan.remove:
+        logger.debug(f.name, title='remove stale')
+        f.unlink(missing_ok=True)
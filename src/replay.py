@@ -0,0 +1,310 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from pathlib import Path
+import threading
+import hashlib
+import json
+import time
+
+from requests.adapters import HTTPAdapter
+
+from .utils import API_BASE, ensure_directory, read_json, write_json
+from . import logger
+
+# arquivo com o índice de todas as respostas gravadas, dentro do diretório de fixtures
+FIXTURE_INDEX = 'index.json'
+FIXTURE_BODIES = 'bodies'
+
+# headers das respostas que são gravados e devolvidos pelo servidor local
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+# headers que fazem o servidor real responder só uma parte (206) ou nada (304)
+# na gravação eles são removidos, pra que sempre fique gravada a resposta inteira
+CONDITIONAL_HEADERS = ('Range', 'If-None-Match', 'If-Modified-Since')
+
+# requisições que não são pra api ficam gravadas com esse prefixo, seguido do host
+# ex: https://cdn.modrinth.com/data/... -> /_host/cdn.modrinth.com/data/...
+HOST_PREFIX = '/_host/'
+
+def request_key(url: str) -> str:
+    """
+    identifica uma requisição gravada pelo caminho e query, sem o host da api
+
+    ex:
+        https://api.modrinth.com/v2/project/sodium -> /v2/project/sodium
+        https://cdn.modrinth.com/data/x/sodium.jar -> /_host/cdn.modrinth.com/data/x/sodium.jar
+    """
+
+    parts = urlsplit(url)
+
+    if parts.netloc == urlsplit(API_BASE).netloc:
+        key = parts.path
+    else:
+        key = HOST_PREFIX + parts.netloc + parts.path
+
+    if parts.query:
+        key += '?' + parts.query
+
+    return key
+
+class Fixtures:
+    """
+    respostas gravadas de uma sessão real com o modrinth
+
+    o diretório tem um index.json com o status e os headers de cada requisição,
+    e o corpo de cada resposta num arquivo separado em bodies/
+
+    os dados gerais de projetos também ficam guardados por id, não só pela requisição
+    assim o servidor local consegue responder um /projects com qualquer combinação de ids
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+        index = read_json(directory / FIXTURE_INDEX)
+        self.responses: dict[str, dict] = index.get('responses', {})
+        self.projects: dict[str, dict] = index.get('projects', {})
+        self.slugs: dict[str, str] = index.get('slugs', {})
+        self.hosts: list[str] = index.get('hosts', [])
+
+    def _save(self):
+        write_json(self.directory / FIXTURE_INDEX, {
+            'responses': self.responses,
+            'projects': self.projects,
+            'slugs': self.slugs,
+            'hosts': self.hosts
+        })
+
+    def _add_project(self, data: dict):
+        if not isinstance(data, dict) or not data.get('id'):
+            return
+
+        self.projects[data['id']] = data
+        if data.get('slug'):
+            self.slugs[data['slug']] = data['id']
+
+    def record(self, url: str, status: int, headers: dict, body: bytes):
+        key = request_key(url)
+        body_name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+        ensure_directory(self.directory / FIXTURE_BODIES)
+        (self.directory / FIXTURE_BODIES / body_name).write_bytes(body)
+
+        with self._lock:
+            self.responses[key] = {
+                'status': status,
+                'headers': { h: headers[h] for h in RECORDED_HEADERS if h in headers },
+                'body': body_name
+            }
+
+            netloc = urlsplit(url).netloc
+            if key.startswith(HOST_PREFIX) and netloc not in self.hosts:
+                self.hosts.append(netloc)
+
+            # /project/{id} e /projects também alimentam os dados por id
+            path = [ p for p in urlsplit(url).path.split('/') if p ]
+            is_project = len(path) >= 2 and path[-2] == 'project'
+            is_projects = path[-1:] == ['projects']
+
+            if status == 200 and (is_project or is_projects):
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    data = None
+
+                for d in data if isinstance(data, list) else [data]:
+                    self._add_project(d)
+
+            self._save()
+
+    def get(self, key: str) -> tuple[dict, bytes] | None:
+        entry = self.responses.get(key)
+        if entry is None:
+            return
+
+        body = (self.directory / FIXTURE_BODIES / entry['body']).read_bytes()
+        return entry, body
+
+    def find_project(self, key: str) -> dict | None:
+        project_id = self.slugs.get(key, key)
+        return self.projects.get(project_id)
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    adapter do requests que grava toda resposta recebida num diretório de fixtures
+
+    as requisições são mandadas sem Range e sem validadores, então a gravação
+    sempre tem o corpo inteiro. um 200 no lugar de um 304, ou no lugar do 206
+    de um download continuado, é tratado normalmente, só baixando um pouco mais
+
+    o download em pedaços não aceita um 200, então os HEAD gravados não anunciam
+    Accept-Ranges, e arquivos grandes são baixados numa requisição só
+    """
+
+    def __init__(self, fixtures: Fixtures, **kwargs):
+        self.fixtures = fixtures
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        for h in CONDITIONAL_HEADERS:
+            request.headers.pop(h, None)
+
+        response = super().send(request, **kwargs)
+
+        if request.method == 'HEAD':
+            response.headers.pop('Accept-Ranges', None)
+
+        if request.method == 'GET' and response.status_code < 400:
+            # ler o corpo aqui não atrapalha quem pediu com stream=True,
+            # o requests passa a entregar os chunks a partir do que já foi lido
+            self.fixtures.record(request.url, response.status_code, response.headers, response.content)
+
+        return response
+
+def _rewrite_hosts(body: bytes, hosts: list[str], base: str) -> bytes:
+    """
+    troca urls de outros hosts (tipo o cdn) dentro de um json pelo servidor local
+    """
+
+    for host in hosts:
+        for scheme in ('https', 'http'):
+            body = body.replace(f'{scheme}://{host}'.encode(), f'{base}{HOST_PREFIX}{host}'.encode())
+
+    return body
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # sem buffer, headers e corpo saem em pacotes separados e o keep-alive
+    # esbarra no delayed ack do tcp, somando ~40ms em cada resposta
+    wbufsize = 64 * 1024
+
+    # preenchidos por serve
+    fixtures: Fixtures
+    latency: float = 0
+    bandwidth: int | None = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args, title='stand-in')
+
+    def _base(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _write_body(self, body: bytes):
+        if not self.bandwidth:
+            self.wfile.write(body)
+            return
+
+        # limita a banda mandando pedaços de 1/10 de segundo
+        chunk = max(1, self.bandwidth // 10)
+        for i in range(0, len(body), chunk):
+            self.wfile.write(body[i:i + chunk])
+            self.wfile.flush()
+            time.sleep(len(body[i:i + chunk]) / self.bandwidth)
+
+    def _send(self, status: int, body: bytes, headers: dict, head_only: bool = False):
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if not head_only:
+            self._write_body(body)
+
+        self.wfile.flush()
+
+    def _not_found(self, head_only: bool):
+        body = json.dumps({ 'error': 'not_found', 'description': f'sem fixture pra {self.path}' }).encode()
+        self._send(404, body, { 'Content-Type': 'application/json' }, head_only)
+
+    def _projects_response(self, path: list[str], query: dict) -> bytes | None:
+        """
+        responde /v2/project/{id} e /v2/projects pelos dados guardados por id
+        """
+
+        if path[-1] == 'projects' and 'ids' in query:
+            ids = json.loads(query['ids'][0])
+            found = [ self.fixtures.find_project(i) for i in ids ]
+            return json.dumps([ p for p in found if p is not None ]).encode()
+
+        if len(path) == 3 and path[1] == 'project':
+            project = self.fixtures.find_project(path[2])
+            if project is not None:
+                return json.dumps(project).encode()
+
+    def _handle(self, head_only: bool = False):
+        time.sleep(self.latency)
+
+        parts = urlsplit(self.path)
+        path = parts.path.strip('/').split('/')
+
+        recorded = self.fixtures.get(self.path)
+        if recorded is not None:
+            entry, body = recorded
+            status, headers = entry['status'], dict(entry['headers'])
+        else:
+            body = self._projects_response(path, parse_qs(parts.query))
+            if body is None:
+                return self._not_found(head_only)
+            status, headers = 200, { 'Content-Type': 'application/json' }
+
+        if headers.get('Content-Type', '').startswith('application/json'):
+            body = _rewrite_hosts(body, self.fixtures.hosts, self._base())
+        else:
+            headers['Accept-Ranges'] = 'bytes'
+
+        etag = headers.get('ETag')
+        if etag and self.headers.get('If-None-Match') == etag:
+            return self._send(304, b'', { 'ETag': etag }, head_only=True)
+
+        byte_range = self.headers.get('Range')
+        if byte_range and status == 200 and byte_range.startswith('bytes='):
+            start, _, end = byte_range[len('bytes='):].partition('-')
+            start = int(start)
+            end = min(int(end), len(body) - 1) if end else len(body) - 1
+
+            if start >= len(body):
+                return self._send(416, b'', { 'Content-Range': f'bytes */{len(body)}' }, head_only=True)
+
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(body)}'
+            return self._send(206, body[start:end + 1], headers, head_only)
+
+        self._send(status, body, headers, head_only)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_HEAD(self):
+        self._handle(head_only=True)
+
+def serve(
+    directory: Path,
+    host: str = '127.0.0.1',
+    port: int = 8080,
+    latency: float = 0,
+    bandwidth: int | None = None
+    ) -> ThreadingHTTPServer:
+    """
+    cria um servidor local que responde como o modrinth a partir de fixtures gravadas
+    o servidor não é iniciado, quem chama decide entre serve_forever ou uma thread
+
+    pra usar, o modtaur deve ser iniciado com MODTAUR_API_BASE=http://host:port/v2
+
+    args:
+        latency:
+            segundos de espera antes de cada resposta, simulando a distância até o servidor
+
+        bandwidth:
+            bytes por segundo de cada resposta. None não limita
+    """
+
+    handler = type('StandInHandler', (_StandInHandler,), {
+        'fixtures': Fixtures(directory),
+        'latency': latency,
+        'bandwidth': bandwidth
+    })
+
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,137 @@
+from pathlib import Path
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .utils import HEADERS
+from .replay import Fixtures, RecordingAdapter
+from . import logger
+
+# (conexão, leitura) em segundos
+# sem isso um servidor que parou de responder trava o load pra sempre
+TIMEOUT = (5, 30)
+
+# tamanho do pool de conexões mantidas abertas pra cada host
+# a api recebe várias requisições pequenas, o cdn recebe menos mas bem maiores
+POOL_SIZES = {
+    'https://api.modrinth.com': 16,
+    'https://cdn.modrinth.com': 8,
+}
+DEFAULT_POOL_SIZE = 8
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+_offline = False
+
+class OfflineError(requests.exceptions.ConnectionError):
+    """
+    uma requisição foi tentada com o modo offline ligado
+    herda de ConnectionError, então quem já trata falhas de rede trata isso também
+    """
+
+def build_session(pool_sizes: dict[str, int] = POOL_SIZES, adapter=HTTPAdapter) -> requests.Session:
+    """
+    cria uma sessão com keep-alive e um pool de conexões por host
+
+    reaproveitar a conexão evita um novo handshake tcp+tls a cada requisição
+    pro modrinth, o que numa chamada de load acontece centenas de vezes
+
+    args:
+        pool_sizes:
+            prefixo de url -> quantidade de conexões mantidas abertas pra ele
+            hosts que não estão aqui usam o DEFAULT_POOL_SIZE
+
+        adapter:
+            classe (ou função) que cria os adapters, recebendo os mesmos argumentos do HTTPAdapter
+    """
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+
+    default = adapter(pool_connections=len(pool_sizes) + 1, pool_maxsize=DEFAULT_POOL_SIZE)
+    session.mount('https://', default)
+    session.mount('http://', default)
+
+    # o requests escolhe o adapter com o prefixo mais longo que bate com a url
+    for prefix, size in pool_sizes.items():
+        session.mount(prefix, adapter(pool_maxsize=size))
+
+    return session
+
+def get_session() -> requests.Session:
+    """
+    retorna a sessão compartilhada por todo o tráfego com o modrinth
+    ela só é criada na primeira vez que for pedida
+    """
+
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+def set_session(session: requests.Session | None):
+    """
+    troca a sessão usada por todas as requisições
+    serve pra testes e benchmarks apontarem pra um servidor falso local
+
+    passar None faz a próxima chamada de get_session criar uma sessão nova
+    """
+
+    global _session
+
+    with _session_lock:
+        _session = session
+
+def record_to(directory: Path):
+    """
+    troca a sessão por uma que grava todas as respostas em directory
+    as fixtures gravadas depois podem ser servidas pelo servidor local de replay.serve
+    """
+
+    fixtures = Fixtures(directory)
+    logger.debug(str(directory), title='record')
+
+    set_session(build_session(adapter=lambda **kwargs: RecordingAdapter(fixtures, **kwargs)))
+
+def set_offline(offline: bool):
+    """
+    liga ou desliga o modo offline. com ele ligado, nenhuma requisição é feita
+    e get e head levantam OfflineError sem nem abrir um socket
+    """
+
+    global _offline
+    _offline = offline
+
+def is_offline() -> bool:
+    return _offline
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    requests.get pela sessão compartilhada, sempre com timeout
+    aceita os mesmos argumentos de requests.get
+    """
+
+    if _offline:
+        raise OfflineError(f'modo offline: {url}')
+
+    logger.debug(url, title='http get')
+
+    kwargs.setdefault('timeout', TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+def head(url: str, **kwargs) -> requests.Response:
+    """
+    requests.head pela sessão compartilhada, sempre com timeout
+    """
+
+    if _offline:
+        raise OfflineError(f'modo offline: {url}')
+
+    logger.debug(url, title='http head')
+
+    kwargs.setdefault('timeout', TIMEOUT)
+    return get_session().head(url, **kwargs)
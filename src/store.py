@@ -0,0 +1,293 @@
+from pathlib import Path
+import threading
+import hashlib
+import shutil
+import os
+
+# fcntl só existe em sistemas unix, sem ele o reflink é simplesmente pulado
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .utils import ensure_directory, read_json, write_json, File
+from . import logger
+
+# ioctl do linux que cria uma cópia por referência (reflink) em btrfs, xfs etc.
+FICLONE = 0x40049409
+
+# índice de nome de arquivo -> caminho relativo ao cache, pra não precisar de rglob
+FILE_INDEX = 'files.json'
+INDEXED_SUFFIXES = ('.jar', '.zip')
+
+# do mais forte pro mais fraco, só o primeiro informado pela api é conferido
+HASH_ALGORITHMS = ('sha512', 'sha1')
+
+# mtime que todo blob recebe ao ser guardado (2000-01-01, par pra caber em fat)
+# os arquivos instalados são hardlinks pro mesmo blob, então escrever num jar da .minecraft
+# muda o blob também, e o mtime junto. um blob com outro mtime precisa ser conferido de novo
+BLOB_MTIME_NS = 946684800 * 10**9
+
+_file_indexes: dict[Path, dict[str, str]] = {}
+_file_index_lock = threading.Lock()
+
+def blob_path(cache_root: Path, sha512: str) -> Path:
+    """
+    caminho de um arquivo no armazenamento endereçado por conteúdo
+    ex: cache/blobs/ab/abcdef...
+
+    o mesmo jar sempre cai no mesmo caminho, não importa se ele é um mod direto,
+    uma dependência ou pra qual versão do jogo ele foi baixado
+    """
+
+    return cache_root / 'blobs' / sha512[:2] / sha512
+
+def get_blob(cache_root: Path, file: File) -> Path | None:
+    """
+    returns:
+        o caminho do arquivo no armazenamento, ou None se ele ainda não foi guardado
+        ou se a api não informou o sha512 dele
+    """
+
+    sha512 = file.hashes.get('sha512')
+    if not sha512:
+        return
+
+    blob = blob_path(cache_root, sha512)
+    if not blob.is_file():
+        return
+
+    return blob
+
+def seal_blob(blob: Path):
+    """
+    marca um blob como conferido, com o mtime de BLOB_MTIME_NS
+    """
+
+    os.utime(blob, ns=(BLOB_MTIME_NS, BLOB_MTIME_NS))
+
+def is_blob_sealed(blob: Path) -> bool:
+    """
+    se o blob não foi modificado desde que foi guardado ou conferido pela última vez
+    """
+
+    return blob.stat().st_mtime_ns == BLOB_MTIME_NS
+
+def new_digest(file: File):
+    """
+    returns:
+        um objeto hashlib do algoritmo mais forte que a api informou pra esse arquivo,
+        ou None se ela não informou nenhum
+    """
+
+    for algorithm in HASH_ALGORITHMS:
+        if file.hashes.get(algorithm):
+            return hashlib.new(algorithm)
+
+def file_digest(path: Path, algorithm: str) -> str:
+    digest = hashlib.new(algorithm)
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+def check_file(path: Path, file: File, digest: str | None = None) -> str | None:
+    """
+    confere um arquivo com o tamanho e o hash informados pela api
+
+    args:
+        digest:
+            hash já calculado enquanto o arquivo era escrito, no algoritmo de new_digest
+            se omitido, o arquivo é lido de novo pra calcular
+
+    returns:
+        o motivo da falha, ou None se o arquivo estiver certo
+        o que não foi informado pela api não é conferido
+    """
+
+    # o tamanho é barato e pega a maioria dos downloads truncados
+    actual_size = path.stat().st_size
+    if file.size is not None and actual_size != file.size:
+        return f'tamanho {actual_size}, esperado {file.size}'
+
+    expected = new_digest(file)
+    if expected is None:
+        return
+
+    if digest is None:
+        digest = file_digest(path, expected.name)
+
+    if digest != file.hashes[expected.name]:
+        return f'{expected.name} diferente do informado pela api'
+
+def _scan_cache(cache_root: Path) -> dict[str, str]:
+    """
+    percorre o cache inteiro procurando arquivos já baixados
+    só acontece na primeira vez, quando o índice ainda não existe
+    """
+
+    logger.debug(str(cache_root), title='scan cache')
+
+    index = {}
+    for suffix in INDEXED_SUFFIXES:
+        for f in cache_root.rglob(f'*{suffix}'):
+            if f.is_file():
+                index[f.name] = str(f.relative_to(cache_root))
+
+    return index
+
+def _get_file_index(cache_root: Path) -> dict[str, str]:
+    """
+    lê o índice de arquivos do disco, ou monta ele se ainda não existir
+    depois disso ele fica em memória pelo resto da execução
+    """
+
+    index = _file_indexes.get(cache_root)
+    if index is not None:
+        return index
+
+    file = cache_root / FILE_INDEX
+    if file.is_file():
+        index = read_json(file)
+    else:
+        index = _scan_cache(cache_root)
+        ensure_directory(cache_root)
+        write_json(file, index)
+
+    _file_indexes[cache_root] = index
+    return index
+
+def find_cached_file(cache_root: Path, filename: str) -> Path | None:
+    """
+    procura um arquivo já baixado pelo nome, sem percorrer o cache
+
+    se o índice apontar pra um arquivo que não existe mais (apagado à mão, por exemplo),
+    a entrada é removida e o arquivo é tratado como não encontrado
+    """
+
+    with _file_index_lock:
+        index = _get_file_index(cache_root)
+
+        relative = index.get(filename)
+        if relative is None:
+            return
+
+        path = cache_root / relative
+        if path.is_file():
+            return path
+
+        logger.debug(f'{filename} não existe mais, removendo do índice', title='file index')
+        del index[filename]
+        write_json(cache_root / FILE_INDEX, index)
+
+def register_cached_file(cache_root: Path, filename: str, path: Path):
+    """
+    adiciona um arquivo recém guardado no cache ao índice
+    """
+
+    with _file_index_lock:
+        index = _get_file_index(cache_root)
+
+        relative = str(path.relative_to(cache_root))
+        if index.get(filename) == relative:
+            return
+
+        index[filename] = relative
+        write_json(cache_root / FILE_INDEX, index)
+
+def forget_cached_file(cache_root: Path, filename: str):
+    """
+    remove um arquivo do índice, normalmente por ele não conferir com o que a api informou
+    o arquivo em si continua no disco até ser substituído por um download novo
+    """
+
+    with _file_index_lock:
+        index = _get_file_index(cache_root)
+
+        if index.pop(filename, None) is not None:
+            write_json(cache_root / FILE_INDEX, index)
+
+def add_blob(cache_root: Path, source: Path, file: File) -> Path | None:
+    """
+    guarda um arquivo baixado no armazenamento, se ele já não estiver lá
+
+    returns:
+        o caminho do arquivo guardado, ou None se a api não informou o sha512 dele
+    """
+
+    sha512 = file.hashes.get('sha512')
+    if not sha512:
+        return
+
+    blob = blob_path(cache_root, sha512)
+    if not blob.is_file():
+        ensure_directory(blob.parent)
+
+        # o arquivo é preparado num nome temporário e depois movido
+        # assim outra thread nunca encontra um blob pela metade
+        temp = blob.with_name(f'{blob.name}.{threading.get_ident()}.tmp')
+        link_or_copy(source, temp)
+        seal_blob(temp)
+        temp.replace(blob)
+
+    # o nome também aponta pro blob, pra versões da lista que não informam hash
+    register_cached_file(cache_root, file.filename, blob)
+
+    return blob
+
+def _reflink(source: Path, destination: Path):
+    if fcntl is None:
+        raise OSError('reflink não suportado nesse sistema')
+
+    with source.open('rb') as src, destination.open('wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+def link_or_copy(source: Path, destination: Path) -> str:
+    """
+    coloca source em destination gastando o mínimo de disco possível
+
+    tenta, em ordem:
+        hardlink: nenhum byte é copiado, os dois caminhos apontam pro mesmo arquivo
+        reflink: cópia por referência, só funciona em alguns sistemas de arquivos
+        cópia normal: quando os dois estão em sistemas de arquivos diferentes, por exemplo
+
+    um arquivo que já exista em destination é substituído
+
+    returns:
+        o método que funcionou, usado só no log
+    """
+
+    destination.unlink(missing_ok=True)
+
+    try:
+        os.link(source, destination)
+        return 'hardlink'
+    except OSError:
+        pass
+
+    try:
+        _reflink(source, destination)
+        return 'reflink'
+    except OSError:
+        destination.unlink(missing_ok=True)
+
+    shutil.copy2(source, destination)
+    return 'copy'
+
+def install_file(source: Path, destination_dir: Path, filename: str | None = None) -> Path:
+    """
+    instala um arquivo do cache na .minecraft
+
+    args:
+        filename:
+            nome final do arquivo. obrigatório quando source é um blob,
+            já que o nome dele é só o hash. se omitido, o nome de source é mantido
+    """
+
+    destination = destination_dir / (filename or source.name)
+    method = link_or_copy(source, destination)
+
+    logger.debug(f'{method}: {destination}', title='install file')
+
+    return destination
@@ -1,9 +1,13 @@
 from pathlib import Path
 from dataclasses import dataclass, field
+import threading
 import json
+import os
 
 DOTMINECRAFT = Path.home() / '.minecraft'
-API_BASE = 'https://api.modrinth.com/v2'
+
+# pode apontar pra um servidor local, tipo o de replay.serve, pra testes e benchmarks
+API_BASE = os.environ.get('MODTAUR_API_BASE', 'https://api.modrinth.com/v2').rstrip('/')
 HEADERS = {"User-Agent": "modtaur/0.1"}
 
 @dataclass
@@ -11,12 +15,14 @@ class File:
     url: str
     filename: str
     primary: bool
+    size: int | None = None
+    hashes: dict[str, str] = field(default_factory=dict) # sha1, sha512
 
 @dataclass
 class Dependency:
-    #version_id: str # pode ser usado pra mais precisão, mas até agora não foi implementado
-    project_id: str
+    project_id: str | None # pode ser None quando a dependência é só uma versão fixa
     dependency_type: str
+    version_id: str | None = None # versão exata exigida, quando o autor fixou uma
 
 @dataclass
 class Project:
@@ -41,6 +47,210 @@ class Version:
     dependencies: list[Dependency]
     #changelog: str
 
+def version_index_key(game_version: str, loader: str | None = None) -> str:
+    """
+    chave do índice de VersionList. ex: '1.20.1+fabric', ou só '1.20.1' sem loader
+    é uma string, e não uma tupla, pra que o índice possa ser guardado em json
+    """
+
+    if loader:
+        return f'{game_version}+{loader}'
+
+    return game_version
+
+class VersionList(list):
+    """
+    lista de Version, do jeito que a api manda, com um índice pra escolher a versão
+    compatível sem percorrer a lista inteira
+
+    args:
+        index:
+            chave de version_index_key -> posições na lista das versões compatíveis,
+            na mesma ordem da lista. a chave só com a versão do jogo ignora o loader,
+            que é o caso dos resourcepacks
+
+        release_index:
+            igual ao index, mas só com versões estáveis
+
+        os dois são montados a partir da lista se não forem passados
+        a lista não deve ser modificada depois de criada, já que o índice não acompanha
+    """
+
+    def __init__(
+        self,
+        versions=(),
+        index: dict[str, list[int]] | None = None,
+        release_index: dict[str, list[int]] | None = None
+        ):
+        super().__init__(versions)
+
+        if index is None or release_index is None:
+            index, release_index = self._build_index()
+
+        self.index = index
+        self.release_index = release_index
+
+    def _build_index(self) -> tuple[dict[str, list[int]], dict[str, list[int]]]:
+        index = {}
+        release_index = {}
+
+        for i, v in enumerate(self):
+            keys = []
+            for gv in v.game_versions or []:
+                keys.append(version_index_key(gv))
+                keys.extend(version_index_key(gv, loader) for loader in v.loaders or [])
+
+            for key in keys:
+                index.setdefault(key, []).append(i)
+                if v.version_type == 'release':
+                    release_index.setdefault(key, []).append(i)
+
+        return index, release_index
+
+    def candidates(self, game_version: str, loader: str | None = None, release_only: bool = False) -> list[Version]:
+        """
+        versões compatíveis com a versão do jogo e o loader, na ordem da lista
+        """
+
+        index = self.release_index if release_only else self.index
+        return [ self[i] for i in index.get(version_index_key(game_version, loader), []) ]
+
+@dataclass
+class ResolvedProject:
+    """
+    um projeto que já teve a versão e o arquivo escolhidos, pronto pra ser instalado
+    é o formato de cada item do lockfile
+
+    args:
+        dependencies:
+            ids dos projetos que são dependências obrigatórias dessa versão
+        
+        is_dependency_for:
+            slug do projeto que puxou esse como dependência, ou None
+            se ele foi listado diretamente no modpack
+    """
+
+    slug: str
+    project_id: str
+    project_type: str
+    version_id: str
+    file: File
+    dependencies: list[str] = field(default_factory=list)
+    is_dependency_for: str | None = None
+
+@dataclass
+class DependencyGraph:
+    """
+    todos os projetos de um modpack e as dependências entre eles, já resolvidos
+
+    args:
+        nodes:
+            id do projeto -> ResolvedProject, na ordem em que foram descobertos,
+            ou seja, primeiro os do modpack, depois as dependências deles, e assim por diante
+        
+        edges:
+            id do projeto -> ids das dependências obrigatórias dele que foram resolvidas
+            uma dependência compartilhada (tipo fabric-api) aparece em várias listas
+        
+        roots:
+            ids dos projetos listados diretamente no modpack
+    """
+
+    nodes: dict[str, ResolvedProject] = field(default_factory=dict)
+    edges: dict[str, list[str]] = field(default_factory=dict)
+    roots: list[str] = field(default_factory=list)
+
+    def add_edge(self, parent_id: str, child_id: str):
+        children = self.edges.setdefault(parent_id, [])
+        if child_id not in children:
+            children.append(child_id)
+
+    def install_order(self) -> list[ResolvedProject]:
+        """
+        todos os projetos com as dependências sempre antes de quem depende delas
+        assim uma instalação interrompida nunca deixa um mod sem as dependências
+        ciclos são quebrados na ordem de descoberta
+        """
+
+        order = []
+        visited = set()
+
+        def _visit(project_id: str):
+            if project_id in visited or project_id not in self.nodes:
+                return
+            visited.add(project_id)
+
+            for child in self.edges.get(project_id, []):
+                _visit(child)
+
+            order.append(self.nodes[project_id])
+
+        for project_id in self.nodes:
+            _visit(project_id)
+
+        return order
+
+@dataclass
+class ReconcilePlan:
+    """
+    diferença entre os arquivos que um modpack precisa e os que já estão instalados
+
+    args:
+        add:
+            projetos cujo arquivo está ausente ou diferente do esperado
+        
+        keep:
+            projetos cujo arquivo já está instalado e correto
+        
+        remove:
+            arquivos instalados que não fazem parte do modpack
+    """
+
+    add: list[ResolvedProject] = field(default_factory=list)
+    keep: list[ResolvedProject] = field(default_factory=list)
+    remove: list[Path] = field(default_factory=list)
+
+@dataclass
+class InstallPlan:
+    """
+    tudo que um load vai fazer, calculado antes de qualquer arquivo da .minecraft ser tocado
+
+    args:
+        resolved:
+            todos os projetos e dependências, na ordem do modpack
+        
+        cached:
+            projetos cujo arquivo já está no cache e só precisa ser copiado
+        
+        to_download:
+            projetos cujo arquivo ainda precisa ser baixado
+        
+        unresolved:
+            slugs ou ids que não existem ou não têm versão compatível
+
+        unavailable:
+            projetos resolvidos cujo arquivo não está no cache, no modo offline
+            ficam aqui em vez de to_download, já que não têm como ser baixados
+
+        failed:
+            projetos de to_download cujo arquivo continuou faltando depois do prefetch
+    """
+
+    resolved: list[ResolvedProject] = field(default_factory=list)
+    cached: list[ResolvedProject] = field(default_factory=list)
+    to_download: list[ResolvedProject] = field(default_factory=list)
+    unresolved: list[str] = field(default_factory=list)
+    unavailable: list[ResolvedProject] = field(default_factory=list)
+    failed: list[ResolvedProject] = field(default_factory=list)
+
+    @property
+    def satisfiable(self) -> bool:
+        return not self.unresolved and not self.unavailable and not self.failed
+
+    @property
+    def download_bytes(self) -> int:
+        return sum(r.file.size or 0 for r in self.to_download)
+
 @dataclass
 class Context:
     """
@@ -70,6 +280,19 @@ class Context:
         resolved:
             slugs de mods que já foram resolvidos pelo software
             isso evita ciclos de dependência, fazendo o mesmo mod não ser visitado duas vezes
+
+        jobs:
+            quantidade de projetos resolvidos e baixados ao mesmo tempo
+
+        refresh:
+            ignora o ttl do cache de projetos, sempre pedindo os dados pra api
+
+        unresolved:
+            slugs ou ids de projetos que não existem ou não têm versão compatível
+
+        retry_unresolved:
+            ignora o cache negativo, perguntando de novo pra api
+            por projetos que falharam recentemente
     """
 
     version: str
@@ -77,6 +300,24 @@ class Context:
     dotminecraft: Path
     cache_root: Path
     resolved: set[str] = field(default_factory=set)
+    jobs: int = 1
+    refresh: bool = False
+    unresolved: set[str] = field(default_factory=set)
+    retry_unresolved: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def claim(self, project_id: str) -> bool:
+        """
+        marca um projeto como resolvido, retornando false se ele já tinha sido marcado antes
+        a verificação e a adição acontecem juntas, então duas threads nunca resolvem o mesmo projeto
+        """
+
+        with self._lock:
+            if project_id in self.resolved:
+                return False
+
+            self.resolved.add(project_id)
+            return True
 
 class DotMinecraft:
     base: Path = Path.home() / '.minecraft'
@@ -106,8 +347,12 @@ def read_json(file: Path):
         return {}
 
 def write_json(file: Path, data):
+    # escreve num arquivo temporário e só depois troca pelo original
+    # assim outra thread lendo o mesmo arquivo nunca vê ele pela metade
+    temp = file.with_name(f'{file.name}.{threading.get_ident()}.tmp')
     try:
-        with file.open('w', encoding='utf-8') as f:
+        with temp.open('w', encoding='utf-8') as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
+        temp.replace(file)
     except Exception:
-        pass
\ No newline at end of file
+        temp.unlink(missing_ok=True)
\ No newline at end of file